@@ -0,0 +1,71 @@
+import math
+import pygame
+import startup
+
+class AudioManager:
+    """音效调度器，建立在ResourceManager.sounds之上：
+    只使用固定数量的通道，同一音效有冷却时间，同一帧内的多次触发合并为一次播放，
+    合并的次数越多音量越大；播放不了的触发计为丢弃"""
+    def __init__(self, res_manager, channels=8, cooldown_ms=80, volume=0.7):
+        self.res = res_manager
+        self.channel_budget = channels
+        self.default_cooldown = cooldown_ms
+        self.cooldowns = {}  # 按音效名覆盖冷却时间（毫秒）
+        self.volumes = {}    # 按音效名覆盖单次播放的音量
+        self.default_volume = volume
+        self._channels = None
+        self._pending = {}   # 本帧的触发次数，按首次触发顺序
+        self._last_played = {}
+        self.stats = {"triggered": 0, "played": 0, "merged": 0, "dropped": 0}
+
+    def trigger(self, name, count=1):
+        # 登记触发，实际播放在flush时统一进行
+        if count > 0:
+            self._pending[name] = self._pending.get(name, 0) + count
+            self.stats["triggered"] += count
+
+    def flush(self, now=None):
+        # 每帧调用一次，把本帧的触发合并后播放
+        if not self._pending:
+            return
+        now = pygame.time.get_ticks() if now is None else now
+        stats = self.stats
+        for name, count in self._pending.items():
+            last = self._last_played.get(name)
+            if last is not None and now - last < self.cooldowns.get(name, self.default_cooldown):
+                stats["dropped"] += count
+                continue
+            sound = self.res.get_sound(name)
+            channel = self._free_channel() if sound is not None else None
+            if channel is None:
+                stats["dropped"] += count
+                continue
+            channel.set_volume(self.merged_volume(name, count))
+            channel.play(sound)
+            self._last_played[name] = now
+            stats["played"] += 1
+            stats["merged"] += count - 1
+        self._pending.clear()
+
+    def merged_volume(self, name, count):
+        # 合并n次触发时音量按log2(n)增大，不超过1
+        volume = self.volumes.get(name, self.default_volume)
+        return min(1.0, volume * (1 + 0.25 * math.log2(count)))
+
+    def _free_channel(self):
+        # 通道在音频初始化后才分配；全部占用时返回None，不抢占正在播放的音效
+        if self._channels is None:
+            if not startup.init_mixer():
+                return None
+            if pygame.mixer.get_num_channels() < self.channel_budget:
+                pygame.mixer.set_num_channels(self.channel_budget)
+            self._channels = [pygame.mixer.Channel(i) for i in range(self.channel_budget)]
+        for channel in self._channels:
+            if not channel.get_busy():
+                return channel
+        return None
+
+    def report(self):
+        stats = self.stats
+        return (f"音效: 触发{stats['triggered']}次，播放{stats['played']}次，"
+                f"合并{stats['merged']}次，丢弃{stats['dropped']}次")
@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import sys
+import numpy as np
+
+from simulation import Simulation
+from path_coverage import CoverageIndex
+from batch import run_batch
+from waves import load_waves
+
+def score_layouts(index, damage_rows, target_health, speed=2.0):
+    """批量评分：damage_rows[i]为第i个布局在各路径段上的伤害之和
+    按平均速度通过路径时累计伤害达到target_health（一整波敌人的总血量）即视为全灭，
+    越早全灭得分越高（1~2）；否则得分为造成的伤害占比（0~1）"""
+    damage = np.cumsum(damage_rows, axis=1) / speed
+    total = damage[:, -1]
+    killed = total >= target_health
+    kill_bin = np.argmax(damage >= target_health, axis=1)
+    return np.where(killed, 2.0 - kill_bin / index.bins, total / target_health)
+
+def search(index, costs, budget, target_health, beam=32, top=8):
+    """在预算内束搜索防御塔布局：每一步用覆盖矩阵一次评估所有可追加的(格子, 塔类型)，
+    保留得分最高的beam个布局，直到买不起任何塔为止；返回得分最高的top个布局"""
+    matrix = index.matrix
+    cost = np.array([costs[kind] for _, kind in index.options])
+    cell_ids = {cell: i for i, cell in enumerate(index.cells)}
+    option_cell = np.array([cell_ids[cell] for cell, _ in index.options])
+
+    beams = [((), np.zeros(index.bins, dtype=np.float32), budget)]
+    finished = {}
+    while beams:
+        children = {}
+        for layout, damage, money in beams:
+            used = np.isin(option_cell, option_cell[list(layout)])
+            choices = np.flatnonzero((cost <= money) & ~used)
+            if len(choices) == 0:
+                finished[layout] = (score_layouts(index, damage[None], target_health)[0], damage)
+                continue
+            scores = score_layouts(index, damage + matrix[choices], target_health)
+            for j in np.argsort(-scores, kind='stable')[:beam].tolist():
+                option = choices[j].item()
+                child = tuple(sorted(layout + (option,)))
+                if child not in children:
+                    children[child] = (scores[j], damage + matrix[option], money - cost[option])
+        ranked = sorted(children.items(), key=lambda item: -item[1][0])[:beam]
+        beams = [(layout, damage, money) for layout, (_, damage, money) in ranked]
+
+    best = sorted(finished.items(), key=lambda item: -item[1][0])[:top]
+    results = []
+    for layout, (score, _) in best:
+        placements = []
+        for option in layout:
+            (col, row), kind = index.options[option]
+            placements.append(f"{kind}:{col},{row}")
+        results.append({
+            "placements": placements,
+            "score": float(score),
+            "cost": int(cost[list(layout)].sum()) if layout else 0
+        })
+    return results
+
+def verify(candidates, runs=20, seed=0, workers=None, max_ticks=36000, max_waves=None,
+           params=None, waves=None):
+    # 用batch.py的进程池对每个候选布局跑多个种子的无显示模拟，按实际结果重新排序
+    config = {
+        "layouts": {f"candidate{i}": c["placements"] for i, c in enumerate(candidates)},
+        "params": {"default": params or {}},
+        "runs": runs,
+        "seed": seed,
+        "max_ticks": max_ticks,
+        "max_waves": max_waves,
+        "waves": waves
+    }
+    with open(os.devnull, 'w', encoding='utf-8') as out:
+        summary = run_batch(config, out, workers)
+    for group in summary:
+        candidates[int(group['layout'][len('candidate'):])]['simulated'] = group
+    return sorted(candidates, key=lambda c: (c['simulated']['defeat_rate'],
+                                             -c['simulated']['waves_survived_mean'],
+                                             c['simulated']['lives_lost_mean']))
+
+def main():
+    parser = argparse.ArgumentParser(description="基于覆盖索引的自动布塔")
+    parser.add_argument('--budget', type=int, default=None, help="建塔预算，默认为初始金钱")
+    parser.add_argument('--beam', type=int, default=32, help="束搜索宽度")
+    parser.add_argument('--candidates', type=int, default=8, help="送去模拟验证的布局数")
+    parser.add_argument('--runs', type=int, default=20, help="每个布局模拟的种子数，0为不验证")
+    parser.add_argument('--seed', type=int, default=0, help="第一个随机种子")
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认等于CPU核数")
+    parser.add_argument('--max-ticks', type=int, default=36000, help="每次模拟最多的帧数")
+    parser.add_argument('--max-waves', type=int, default=None, help="完成该波次后停止模拟")
+    parser.add_argument('--params', metavar='FILE', help="平衡参数JSON文件")
+    parser.add_argument('--waves-file', metavar='FILE', help="波次文件，见waves.py")
+    args = parser.parse_args()
+
+    params = None
+    if args.params:
+        with open(args.params, encoding='utf-8') as f:
+            params = json.load(f)
+    waves = load_waves(args.waves_file) if args.waves_file else None
+    sim = Simulation(seed=args.seed, params=params)
+    index = CoverageIndex.from_simulation(sim)
+    budget = sim.money if args.budget is None else args.budget
+    # 以最大一波敌人的总血量为目标
+    candidates = search(index, sim.tower_costs, budget, sim.wave_cap * 100, args.beam,
+                        args.candidates)
+    print(f"{len(index.options)}个候选位置，评估得到{len(candidates)}个布局", file=sys.stderr)
+    if args.runs and candidates:
+        candidates = verify(candidates, args.runs, args.seed, args.workers, args.max_ticks,
+                            args.max_waves, params, waves)
+    print(json.dumps(candidates, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
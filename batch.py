@@ -0,0 +1,133 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+
+from headless import run_headless, parse_placement
+
+def iter_jobs(config):
+    # 按(布局, 参数组, 种子)惰性生成任务，不一次性展开到内存
+    runs = config.get('runs', 100)
+    first_seed = config.get('seed', 0)
+    layouts = config['layouts']
+    param_sets = config.get('params', {'default': {}})
+    for (layout, placements), (params_name, params) in itertools.product(layouts.items(),
+                                                                         param_sets.items()):
+        parsed = [parse_placement(p) for p in placements]
+        for seed in range(first_seed, first_seed + runs):
+            yield {
+                "layout": layout,
+                "params_name": params_name,
+                "seed": seed,
+                "placements": parsed,
+                "params": params,
+                "max_ticks": config.get('max_ticks', 36000),
+                "max_waves": config.get('max_waves'),
+                "batched_enemies": config.get('batched_enemies', False),
+                "waves": config.get('waves'),
+                "level": config.get('level')
+            }
+
+def count_jobs(config):
+    return config.get('runs', 100) * len(config['layouts']) * len(config.get('params', {'default': {}}))
+
+def run_job(job):
+    result = run_headless(job['seed'], job['placements'], job['max_ticks'], job['max_waves'],
+                          job['batched_enemies'], job['params'], job['waves'], job['level'])
+    result['layout'] = job['layout']
+    result['params_name'] = job['params_name']
+    return result
+
+class Aggregate:
+    # 按(布局, 参数组)增量汇总结果，只保存累计量
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, result):
+        key = (result['layout'], result['params_name'])
+        g = self.groups.get(key)
+        if g is None:
+            g = self.groups[key] = {
+                "runs": 0, "defeated": 0, "waves_survived": 0, "min_waves": None,
+                "max_waves": None, "lives_lost": 0, "kills": {}, "money_sum": [],
+                "money_count": [], "ticks_per_second": 0.0
+            }
+        g['runs'] += 1
+        g['defeated'] += result['outcome'] == 'defeated'
+        waves = result['waves_survived']
+        g['waves_survived'] += waves
+        g['min_waves'] = waves if g['min_waves'] is None else min(g['min_waves'], waves)
+        g['max_waves'] = waves if g['max_waves'] is None else max(g['max_waves'], waves)
+        g['lives_lost'] += result['lives_lost']
+        g['ticks_per_second'] += result['ticks_per_second']
+        for kind, count in result['kills'].items():
+            g['kills'][kind] = g['kills'].get(kind, 0) + count
+        for i, money in enumerate(result['money_curve']):
+            if i == len(g['money_sum']):
+                g['money_sum'].append(0)
+                g['money_count'].append(0)
+            g['money_sum'][i] += money
+            g['money_count'][i] += 1
+
+    def summary(self):
+        out = []
+        for (layout, params_name), g in sorted(self.groups.items()):
+            runs = g['runs']
+            out.append({
+                "layout": layout,
+                "params_name": params_name,
+                "runs": runs,
+                "defeat_rate": g['defeated'] / runs,
+                "waves_survived_mean": g['waves_survived'] / runs,
+                "waves_survived_min": g['min_waves'],
+                "waves_survived_max": g['max_waves'],
+                "lives_lost_mean": g['lives_lost'] / runs,
+                "kills_mean": {kind: count / runs for kind, count in sorted(g['kills'].items())},
+                "money_curve_mean": [s / c for s, c in zip(g['money_sum'], g['money_count'])],
+                "ticks_per_second_mean": g['ticks_per_second'] / runs
+            })
+        return out
+
+def run_batch(config, output, workers=None, progress=None):
+    """在进程池中运行全部模拟，逐条写入output（JSON Lines），返回汇总"""
+    workers = workers or os.cpu_count() or 1
+    total = count_jobs(config)
+    chunksize = max(1, min(32, total // (workers * 8)))
+    aggregate = Aggregate()
+    with multiprocessing.Pool(workers) as pool:
+        for done, result in enumerate(pool.imap_unordered(run_job, iter_jobs(config), chunksize), 1):
+            output.write(json.dumps(result, ensure_ascii=False) + '\n')
+            aggregate.add(result)
+            if progress:
+                progress(done, total)
+    return aggregate.summary()
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程批量平衡模拟")
+    parser.add_argument('config', help="批量配置JSON文件（layouts、params、runs等）")
+    parser.add_argument('--output', default='batch_results.jsonl', help="逐条结果输出文件")
+    parser.add_argument('--summary', help="汇总输出文件，默认打印到stdout")
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认等于CPU核数")
+    args = parser.parse_args()
+
+    with open(args.config, encoding='utf-8') as f:
+        config = json.load(f)
+
+    def progress(done, total):
+        if done % 100 == 0 or done == total:
+            print(f"{done}/{total}", file=sys.stderr)
+
+    with open(args.output, 'w', encoding='utf-8') as out:
+        summary = run_batch(config, out, args.workers, progress)
+
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+# 基准测试不需要真实窗口和声卡
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from simulation import Simulation, TOWER_CLASSES
+from enemy import Enemy
+
+PHASES = ('enemy_update', 'index_rebuild', 'tower_attack', 'projectile_update')
+
+def build_scenario(towers, enemies, seed=0, batched_enemies=False, ticks=100):
+    # 构造确定性的场景：随机但可复现的塔位置和沿路径分布的敌人
+    rng = random.Random(seed)
+    sim = Simulation(seed=seed, batched_enemies=batched_enemies)
+    sim.lives = 10**9
+
+    cells = [rect.center for rect in sim.buildable_grid]
+    classes = [TOWER_CLASSES[name] for name in sorted(TOWER_CLASSES)]
+    for _ in range(towers):
+        x, y = rng.choice(cells)
+        tower = rng.choice(classes)(x, y)
+        tower.cooldown = rng.randint(0, tower.cooldown_max)
+        sim.towers.append(tower)
+
+    # 敌人分布在路径上且血量足够高，保证测试期间数量不变
+    limit = max(sim.path.length - ticks * 3.0, 1.0)
+    for _ in range(enemies):
+        enemy_type = 'enemy1' if rng.random() < 0.7 else 'enemy2'
+        if sim.enemy_store:
+            enemy = sim.enemy_store.spawn(enemy_type, rng)
+        else:
+            enemy = Enemy(sim.path, enemy_type, rng)
+            sim.enemies.append(enemy)
+        enemy.distance = rng.uniform(0, limit)
+        enemy.x, enemy.y = sim.path.position_at(enemy.distance)
+        enemy.health = enemy.max_health = 10**9
+    if sim.enemy_store:
+        sim.enemies = sim.enemy_store.views
+    return sim, rng
+
+def top_up_projectiles(sim, rng, count):
+    # 补充子弹到指定数量，模拟密集弹幕
+    width, height = sim.screen_size
+    while sim.projectiles.count < count:
+        sim.projectiles.spawn(rng.uniform(0, width), rng.uniform(0, height),
+                              rng.uniform(-width, 2 * width), rng.uniform(-height, 2 * height),
+                              5, 0, (255, 255, 255), 3, 'bench')
+
+def run_scenario(towers, enemies, projectiles, ticks=100, draw_frames=30, seed=0,
+                 batched_enemies=False):
+    sim, rng = build_scenario(towers, enemies, seed, batched_enemies, ticks)
+    phases = dict.fromkeys(PHASES, 0.0)
+    clock = time.perf_counter
+
+    total = 0.0
+    for _ in range(ticks):
+        top_up_projectiles(sim, rng, projectiles)
+        sim.tick += 1
+        t0 = clock()
+        sim.update_enemies()
+        t1 = clock()
+        sim.rebuild_index()
+        t2 = clock()
+        sim.update_towers()
+        t3 = clock()
+        sim.update_projectiles()
+        t4 = clock()
+        phases['enemy_update'] += t1 - t0
+        phases['index_rebuild'] += t2 - t1
+        phases['tower_attack'] += t3 - t2
+        phases['projectile_update'] += t4 - t3
+        total += t4 - t0
+
+    result = {
+        "scenario": f"t{towers}-e{enemies}-p{projectiles}",
+        "towers": towers,
+        "enemies": enemies,
+        "projectiles": projectiles,
+        "batched_enemies": batched_enemies,
+        "ticks": ticks,
+        "ticks_per_second": ticks / total if total > 0 else 0.0,
+        "phase_ms": {name: value * 1000 / ticks for name, value in phases.items()}
+    }
+    result["phase_ms"]["update"] = total * 1000 / ticks
+
+    if draw_frames:
+        game = _offscreen_game()
+        game.sim = sim
+        game.draw()  # 预热渲染缓存
+        start = clock()
+        for _ in range(draw_frames):
+            game.draw()
+        result["phase_ms"]["draw"] = (clock() - start) * 1000 / draw_frames
+    return result
+
+_game = None
+
+def _offscreen_game():
+    # 使用SDL dummy视频驱动创建离屏Game，资源加载的提示输出到stderr
+    global _game
+    if _game is None:
+        from game import Game
+        with contextlib.redirect_stdout(sys.stderr):
+            _game = Game(audio=False)
+            _game.res.wait()
+    return _game
+
+def _revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+def compare(baseline_path, results):
+    # 与之前保存的结果逐场景比较每秒帧数
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r["scenario"], r["batched_enemies"]): r for r in map(json.loads, f)}
+    for r in results:
+        old = baseline.get((r["scenario"], r["batched_enemies"]))
+        if old:
+            ratio = r["ticks_per_second"] / old["ticks_per_second"]
+            print(f'{r["scenario"]:<22} {old["ticks_per_second"]:>10.1f} -> '
+                  f'{r["ticks_per_second"]:>10.1f} tick/s  x{ratio:.2f}', file=sys.stderr)
+
+def _int_list(text):
+    return [int(v) for v in text.split(',')]
+
+def main():
+    parser = argparse.ArgumentParser(description="Game.update / Game.draw 热点基准测试")
+    parser.add_argument('--towers', type=_int_list, default=[10, 100, 500])
+    parser.add_argument('--enemies', type=_int_list, default=[20, 500, 5000])
+    parser.add_argument('--projectiles', type=_int_list, default=[100, 2000])
+    parser.add_argument('--ticks', type=int, default=100, help="每个场景模拟的帧数")
+    parser.add_argument('--draw-frames', type=int, default=30, help="每个场景渲染的帧数，0为不测渲染")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batched-enemies', action='store_true', help="使用NumPy批量敌人引擎")
+    parser.add_argument('--output', help="结果写入文件（JSON Lines），默认输出到stdout")
+    parser.add_argument('--compare', metavar='BASELINE', help="与之前的结果文件比较")
+    args = parser.parse_args()
+
+    meta = {"revision": _revision(), "python": platform.python_version()}
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    results = []
+    try:
+        for towers, enemies, projectiles in itertools.product(args.towers, args.enemies, args.projectiles):
+            result = run_scenario(towers, enemies, projectiles, args.ticks, args.draw_frames,
+                                  args.seed, args.batched_enemies)
+            result.update(meta)
+            results.append(result)
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if args.compare:
+        compare(args.compare, results)
+
+if __name__ == "__main__":
+    main()
@@ -3,37 +3,42 @@ import random
 import pygame
 
 class Enemy:
-    def __init__(self, path, enemy_type):
+    # 使用__slots__代替实例字典，减小每个敌人的内存占用
+    __slots__ = ('path', 'distance', 'x', 'y', 'speed', 'health', 'max_health', 'type', 'uid')
+
+    def __init__(self, path, enemy_type, rng=random):
+        self.reset(path, enemy_type, rng)
+
+    def reset(self, path, enemy_type, rng=random):
+        # 重新初始化全部字段，供对象池复用
         self.path = path
-        self.path_index = 0
+        self.distance = 0.0  # 沿路径已行进的距离，也是排序用的前进进度
         self.x, self.y = path.points[0]
-        self.speed = random.uniform(1.0, 3.0)
+        self.speed = rng.uniform(1.0, 3.0)
         self.health = 100
         self.max_health = 100
         self.type = enemy_type  # 'enemy1'或'enemy2'
+        self.uid = -1  # 由Simulation.spawn_enemy分配的唯一编号，对象池复用时也会更新
+        
+    @property
+    def path_index(self):
+        # 正在前往的路径点下标
+        return self.path.segment_at(self.distance) + 1
         
-    def update(self, game):
-        # 移动逻辑
-        if self.path_index < len(self.path.points):
-            target = self.path.points[self.path_index]
-            dx, dy = target[0]-self.x, target[1]-self.y
-            dist = (dx**2 + dy**2)**0.5
-            
-            if dist < 5:
-                self.path_index += 1
-            else:
-                self.x += dx/dist * self.speed
-                self.y += dy/dist * self.speed
+    def update(self, sim):
+        # 移动逻辑：沿弧长前进，坐标由路径查表得到；speed以60Hz的每帧为单位
+        self.distance += self.speed * sim.dt
         
         # 死亡检测
         if self.health <= 0:
             return False
         
         # 终点检测
-        if self.path_index >= len(self.path.points):
-            game.lives -= 1
+        if self.distance >= self.path.length:
+            sim.lives -= 1
             return False
-            
+        
+        self.x, self.y = self.path.position_at(self.distance)
         return True
     
     def take_damage(self, amount):
@@ -41,12 +46,54 @@ class Enemy:
         return self if self.health <= 0 else None
     
     def draw(self, surface, res_manager):
+        # 返回本次绘制覆盖的区域，供局部刷新使用
+        dirty = None
         if self.type in res_manager.images:
             img = res_manager.images[self.type]
             rect = img.get_rect(center=(int(self.x), int(self.y)))
-            surface.blit(img, rect)
+            dirty = surface.blit(img, rect)
         
         # 血条
         health_width = 30 * (self.health / self.max_health)
-        pygame.draw.rect(surface, (255,0,0), (self.x-15, self.y-25, 30, 5))
-        pygame.draw.rect(surface, (0,255,0), (self.x-15, self.y-25, health_width, 5))
\ No newline at end of file
+        bar = pygame.draw.rect(surface, (255,0,0), (self.x-15, self.y-25, 30, 5))
+        pygame.draw.rect(surface, (0,255,0), (self.x-15, self.y-25, health_width, 5))
+        return dirty.union(bar) if dirty else bar
+
+def enemy_blits(enemies, res_manager, positions=None):
+    """批量绘制用：按绘制顺序返回敌人图片和血条的(图片, 位置[, 区域])序列，
+    交给Surface.blits一次完成，结果与逐个调用Enemy.draw相同
+    positions为(xs, ys)时使用这些坐标绘制（渲染插值），否则使用敌人当前坐标"""
+    images = res_manager.images
+    strip = res_manager.get_health_strip(30, 5)
+    blits = []
+    append = blits.append
+    if positions is None:
+        positions = ([e.x for e in enemies], [e.y for e in enemies])
+    for enemy, x, y in zip(enemies, *positions):
+        img = images.get(enemy.type)
+        if img is not None:
+            append((img, img.get_rect(center=(int(x), int(y)))))
+        
+        # 血条：从血条图中截取，绿色宽度与draw中的取整方式一致
+        green = min(max(int(30 * (enemy.health / enemy.max_health)), 0), 30)
+        append((strip, pygame.Rect(x-15, y-25, 30, 5), (30 - green, 0, 30, 5)))
+    return blits
+
+class EnemyPool:
+    # 敌人对象的空闲链表：死亡或到达终点的敌人回收后在下一波复用，避免反复分配
+    def __init__(self):
+        self.free = []
+        self.created = 0  # 新分配的对象数
+        self.reused = 0   # 从空闲链表取出的次数
+
+    def acquire(self, path, enemy_type, rng=random):
+        if self.free:
+            enemy = self.free.pop()
+            enemy.reset(path, enemy_type, rng)
+            self.reused += 1
+            return enemy
+        self.created += 1
+        return Enemy(path, enemy_type, rng)
+
+    def release(self, enemy):
+        self.free.append(enemy)
\ No newline at end of file
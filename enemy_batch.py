@@ -0,0 +1,169 @@
+import random
+import numpy as np
+from enemy import Enemy
+
+class BatchedEnemy(Enemy):
+    # Enemy的轻量视图，所有数据存放在EnemyStore的数组中
+    # 被移除（死亡或到达终点）后视图失效，不应再读取
+    __slots__ = ('_store', '_slot')
+
+    def __init__(self, store, slot):
+        self._store = store
+        self._slot = slot
+
+    @property
+    def path(self):
+        return self._store.path
+
+    @property
+    def x(self):
+        return self._store.x[self._slot]
+
+    @x.setter
+    def x(self, value):
+        self._store.x[self._slot] = value
+
+    @property
+    def y(self):
+        return self._store.y[self._slot]
+
+    @y.setter
+    def y(self, value):
+        self._store.y[self._slot] = value
+
+    @property
+    def speed(self):
+        return self._store.speed[self._slot]
+
+    @speed.setter
+    def speed(self, value):
+        self._store.speed[self._slot] = value
+
+    @property
+    def health(self):
+        return self._store.health[self._slot]
+
+    @health.setter
+    def health(self, value):
+        self._store.health[self._slot] = value
+
+    @property
+    def max_health(self):
+        return self._store.max_health[self._slot]
+
+    @max_health.setter
+    def max_health(self, value):
+        self._store.max_health[self._slot] = value
+
+    @property
+    def distance(self):
+        return self._store.distance[self._slot]
+
+    @distance.setter
+    def distance(self, value):
+        self._store.distance[self._slot] = value
+
+    @property
+    def uid(self):
+        return int(self._store.uid[self._slot])
+
+    @uid.setter
+    def uid(self, value):
+        self._store.uid[self._slot] = value
+
+    @property
+    def type(self):
+        return self._store.types[self._store.type_id[self._slot]]
+
+class EnemyStore:
+    # 结构数组(SoA)形式的敌人存储，一次向量化步进所有敌人
+    def __init__(self, path, capacity=256):
+        self.path = path
+        self.points = np.array(path.points, dtype=np.float64)
+        self.cum_lengths = np.array(path.cum_lengths, dtype=np.float64)
+        self.directions = np.array(path.directions, dtype=np.float64)
+        self.types = ['enemy1', 'enemy2']
+        self.count = 0
+        self.views = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = self.count
+        def grow(name, dtype):
+            arr = np.zeros(capacity, dtype=dtype)
+            if old:
+                arr[:old] = getattr(self, name)[:old]
+            setattr(self, name, arr)
+        grow('x', np.float64)
+        grow('y', np.float64)
+        grow('speed', np.float64)
+        grow('health', np.float64)
+        grow('max_health', np.float64)
+        grow('distance', np.float64)
+        grow('type_id', np.int8)
+        grow('uid', np.int64)
+        self.capacity = capacity
+
+    def spawn(self, enemy_type, rng=random):
+        if self.count == self.capacity:
+            self._allocate(self.capacity * 2)
+        if enemy_type not in self.types:
+            self.types.append(enemy_type)
+        i = self.count
+        self.x[i], self.y[i] = self.path.points[0]
+        self.speed[i] = rng.uniform(1.0, 3.0)
+        self.health[i] = 100
+        self.max_health[i] = 100
+        self.distance[i] = 0
+        self.type_id[i] = self.types.index(enemy_type)
+        self.uid[i] = -1
+        self.count += 1
+        view = BatchedEnemy(self, i)
+        self.views.append(view)
+        return view
+
+    def step(self, sim):
+        # 与Enemy.update逐个更新的逻辑相同，只是一次处理全部敌人
+        n = self.count
+        if n == 0:
+            return self.views
+        distance = self.distance[:n]
+        distance += self.speed[:n] * sim.dt
+
+        # 死亡和终点检测
+        dead = self.health[:n] <= 0
+        finished = ~dead & (distance >= self.path.length)
+        sim.lives -= int(np.count_nonzero(finished))
+
+        keep = ~(dead | finished)
+        if not keep.all():
+            self._compact(np.flatnonzero(keep))
+            n = self.count
+            distance = self.distance[:n]
+
+        # 按弧长查表得到坐标
+        seg = np.searchsorted(self.cum_lengths, distance, side='right') - 1
+        np.clip(seg, 0, len(self.directions) - 1, out=seg)
+        offset = distance - self.cum_lengths[seg]
+        self.x[:n] = self.points[seg, 0] + self.directions[seg, 0] * offset
+        self.y[:n] = self.points[seg, 1] + self.directions[seg, 1] * offset
+        return self.views
+
+    def positions(self):
+        # 供空间索引重建使用的坐标列表
+        n = self.count
+        return self.x[:n].tolist(), self.y[:n].tolist()
+
+    def _compact(self, keep):
+        # 批量压缩，存活的敌人移到数组前部并保持原有顺序
+        k = len(keep)
+        for name in ('x', 'y', 'speed', 'health', 'max_health', 'distance', 'type_id', 'uid'):
+            arr = getattr(self, name)
+            arr[:k] = arr[keep]
+        views = [self.views[i] for i in keep]
+        # 只有第一个被移除位置之后的视图需要更新下标
+        moved = np.flatnonzero(keep != np.arange(k))
+        for slot in range(moved[0] if len(moved) else k, k):
+            views[slot]._slot = slot
+        self.views = views
+        self.count = k
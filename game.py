@@ -1,209 +1,236 @@
-import pygame
 import random
-import math
-from path import Path
-from tower import BasicTower, CannonTower, ArcherTower
-from enemy import Enemy
+import time
+import numpy as np
+import pygame
+import startup
+from simulation import Simulation
+from enemy import enemy_blits
 from resources import ResourceManager
+from audio import AudioManager
+from level import load_level
+
+MAX_FRAME_TIME = 0.25  # 单帧最多补偿的时间，避免卡顿后连续追赶大量tick
 
 class Game:
-    def __init__(self):
-        pygame.init()
-        self.screen = pygame.display.set_mode((800, 600))
-        pygame.display.set_caption("石塔防御战")
+    def __init__(self, batched_enemies=False, seed=None, dirty_rects=False, profiler=None,
+                 audio=True, record=None, tick_rate=60, fps=60, waves=None, endless=False,
+                 level=None, stream_port=None, stream_rate=20):
+        # level为编译后的关卡文件（见level.py），不指定时使用默认路径
+        with startup.timed("level"):
+            self.level = load_level(level) if level else None
+        
+        # 只初始化显示，字体和音频在首次使用时再初始化
+        startup.init_display()
+        with startup.timed("set_mode"):
+            size = self.level.screen_size if self.level else (800, 600)
+            self.screen = pygame.display.set_mode(size)
+            pygame.display.set_caption("石塔防御战")
         
         self.res = ResourceManager()
-        self._load_resources()
-        
-        self.path = Path()
-        self.towers = []
-        self.enemies = []
-        self.wave = 1
-        self.money = 1000
-        self.lives = 10
+        self.audio = audio
+        # 音效统一经过调度器：限制通道数、冷却并合并同一帧的重复触发
+        self.sfx = AudioManager(self.res) if audio else None
+        with startup.timed("queue resources"):
+            self._load_resources()
+        
+        # 录制回放需要确定的随机种子
+        if record and seed is None:
+            seed = random.randrange(2**31)
+        
+        # 模拟状态与渲染、输入分离，Game只负责显示和交互
+        with startup.timed("simulation"):
+            self.sim = Simulation(seed=seed, batched_enemies=batched_enemies,
+                                  screen_size=self.screen.get_size(), tick_rate=tick_rate,
+                                  waves=waves, endless=endless, level=self.level)
         self.selected_tower_type = None
-        self.tower_costs = {
-            "basic": 100,
-            "cannon": 200,
-            "archer": 150
-        }
         self.tower_names = {
             "basic": "基础塔",
             "cannon": "炮塔",
             "archer": "箭塔"
         }
-        self.grid_size = 40
-        self.buildable_grid = self._init_buildable_grid()
         self.clock = pygame.time.Clock()
         self.paused = False  # 新增暂停状态
+        self._hovered = None  # 鼠标悬停的防御塔
+        
+        # 固定步长：模拟按tick_rate推进，渲染按fps进行，两者互不影响
+        self.fps = fps
+        self._accumulator = 0.0
+        self.alpha = 1.0  # 渲染插值系数，1表示直接使用最新模拟状态
+        
+        # 局部刷新渲染模式的状态
+        self.dirty_rects = dirty_rects
+        self._static_layer = None
+        self._static_key = None
+        self._sprite_rects = []
+        self._hud_rects = []
+        self._hud_state = None
+        self._grid_layer = None  # 预渲染的可建造网格线
+        self._grid_source = None
+        
+        # 性能分析器（FrameProfiler），为None时run不做任何计时
+        self.profiler = profiler
+        self.blits = 0  # 上一帧的绘制调用次数
+        
+        # 回放录制器（ReplayRecorder），只记录种子、输入事件和定期快照
+        self.recorder = None
+        if record:
+            from replay import ReplayRecorder
+            self.recorder = ReplayRecorder(record, seed, batched_enemies, tick_rate, waves, endless,
+                                           level)
+        
+        # 可选的状态流服务器（后台线程），供本地面板和机器人观看对局
+        self.stream = None
+        if stream_port is not None:
+            from stream import StateServer
+            self.stream = StateServer(port=stream_port, rate=stream_rate)
+            try:
+                print(f"状态流: 127.0.0.1:{self.stream.start()}")
+            except OSError as e:
+                print(f"状态流启动失败: {e}")
+                self.stream = None
         
     def _load_resources(self):
+        # 资源在后台线程加载，窗口立即可用，就绪前显示占位图
         # 背景图
-        self.res.load_image('assets/background.png', 'background')
+        self.res.load_image_async('assets/background.png', 'background')
         
         # 防御塔图片
-        self.res.load_image('assets/towers/basic.png', 'basic_tower', (50,70))
-        self.res.load_image('assets/towers/cannon.png', 'cannon_tower', (60,80))
-        self.res.load_image('assets/towers/archer.png', 'archer_tower', (55,75))
+        self.res.load_image_async('assets/towers/basic.png', 'basic_tower', (50,70))
+        self.res.load_image_async('assets/towers/cannon.png', 'cannon_tower', (60,80))
+        self.res.load_image_async('assets/towers/archer.png', 'archer_tower', (55,75))
         
         # 敌人图片
-        self.res.load_image('assets/enemies/bird.png', 'enemy1', (35,35))
-        self.res.load_image('assets/enemies/monster.png', 'enemy2', (45,45))
+        self.res.load_image_async('assets/enemies/bird.png', 'enemy1', (35,35))
+        self.res.load_image_async('assets/enemies/monster.png', 'enemy2', (45,45))
         
-        # 音频
-        self.res.load_music('assets/audio/background.mp3')
-        self.res.load_sound('assets/audio/build.wav', 'build')
-        self.res.load_sound('assets/audio/explosion.wav', 'explode')
-
-    def _init_buildable_grid(self):
-        grid = []
-        path_margin = self.path.width // 2 + 15
-        
-        for x in range(0, 800, self.grid_size):
-            for y in range(0, 600, self.grid_size):
-                center = (x + self.grid_size//2, y + self.grid_size//2)
-                
-                is_valid = True
-                for i in range(len(self.path.points)-1):
-                    p1, p2 = self.path.points[i], self.path.points[i+1]
-                    line_vec = (p2[0]-p1[0], p2[1]-p1[1])
-                    point_vec = (center[0]-p1[0], center[1]-p1[1])
-                    cross = abs(line_vec[0]*point_vec[1] - line_vec[1]*point_vec[0])
-                    line_len = math.sqrt(line_vec[0]**2 + line_vec[1]**2)
-                    if cross/line_len < path_margin:
-                        is_valid = False
-                        break
-                
-                if is_valid:
-                    grid.append(pygame.Rect(x, y, self.grid_size, self.grid_size))
-        return grid
+        # 音频（音效在第一次播放时才加载）
+        if self.audio:
+            self.res.load_music_async('assets/audio/background.mp3')
+            self.res.defer_sound('assets/audio/build.wav', 'build')
+            self.res.defer_sound('assets/audio/explosion.wav', 'explode')
 
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return False
+            elif event.type in (pygame.VIDEORESIZE, pygame.VIDEOEXPOSE):
+                self._static_layer = None  # 窗口变化后重建静态图层并整屏刷新
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # 左键点击
                     mouse_x, mouse_y = pygame.mouse.get_pos()
                     
                     # 塔选择按钮
                     if 700 <= mouse_x <= 790 and 100 <= mouse_y <= 130:
-                        self.selected_tower_type = "basic"
+                        self.select_tower("basic")
                     elif 700 <= mouse_x <= 790 and 140 <= mouse_y <= 170:
-                        self.selected_tower_type = "cannon"
+                        self.select_tower("cannon")
                     elif 700 <= mouse_x <= 790 and 180 <= mouse_y <= 210:
-                        self.selected_tower_type = "archer"
+                        self.select_tower("archer")
                     
                     # 建造逻辑
                     elif self.selected_tower_type:
-                        grid_x = (mouse_x // self.grid_size) * self.grid_size
-                        grid_y = (mouse_y // self.grid_size) * self.grid_size
-                        grid_rect = pygame.Rect(grid_x, grid_y, self.grid_size, self.grid_size)
+                        col = mouse_x // self.sim.grid_size
+                        row = mouse_y // self.sim.grid_size
+                        grid_x = col * self.sim.grid_size
+                        grid_y = row * self.sim.grid_size
                         
-                        if any(grid_rect.colliderect(area) for area in self.buildable_grid):
-                            cost = self.tower_costs[self.selected_tower_type]
-                            if self.money >= cost:
-                                if 'build' in self.res.sounds:
-                                    self.res.sounds['build'].play()
-                                
-                                center_x = grid_x + self.grid_size // 2
-                                center_y = grid_y + self.grid_size // 2
-                                if self.selected_tower_type == "basic":
-                                    tower = BasicTower(center_x, center_y)
-                                elif self.selected_tower_type == "cannon":
-                                    tower = CannonTower(center_x, center_y)
-                                elif self.selected_tower_type == "archer":
-                                    tower = ArcherTower(center_x, center_y)
-                                
-                                # 鼠标悬停时显示攻击范围
-                                tower.show_range = False
-                                self.towers.append(tower)
-                                self.money -= cost
-                                self.selected_tower_type = None
+                        if self.recorder:
+                            self.recorder.place(self.sim.tick, self.selected_tower_type, col, row)
+                        if self.sim.build_tower(self.selected_tower_type, grid_x, grid_y):
+                            self._play('build')
+                            self.selected_tower_type = None
             
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_1:
-                    self.selected_tower_type = "basic"
+                    self.select_tower("basic")
                 elif event.key == pygame.K_2:
-                    self.selected_tower_type = "cannon"
+                    self.select_tower("cannon")
                 elif event.key == pygame.K_3:
-                    self.selected_tower_type = "archer"
+                    self.select_tower("archer")
                 elif event.key == pygame.K_SPACE:  # 空格键暂停/继续
                     self.paused = not self.paused
+                    if self.recorder:
+                        self.recorder.pause(self.sim.tick)
+                elif event.key == pygame.K_F3 and self.profiler:  # F3切换性能叠加层
+                    self.profiler.toggle_overlay()
                     
             # 鼠标悬停时显示防御塔攻击范围
             elif event.type == pygame.MOUSEMOTION:
-                mouse_x, mouse_y = pygame.mouse.get_pos()
-                for tower in self.towers:
-                    if math.sqrt((tower.x - mouse_x)**2 + (tower.y - mouse_y)**2) < 30:
+                tower = self.sim.grid.tower_at(*event.pos)
+                if tower is not self._hovered:
+                    if self._hovered:
+                        self._hovered.show_range = False
+                    if tower:
                         tower.show_range = True
-                    else:
-                        tower.show_range = False
+                    self._hovered = tower
                         
         return True
 
-    def update(self):
+    def select_tower(self, tower_type):
+        self.selected_tower_type = tower_type
+        if self.recorder:
+            self.recorder.select(self.sim.tick, tower_type)
+
+    def advance(self, elapsed, tower_timings=None):
+        """累计经过的真实时间，按固定步长推进整数个tick，返回推进的tick数
+        剩余不足一步的时间换算为alpha，供渲染在上一tick与当前tick之间插值"""
+        if self.paused:
+            self._accumulator = 0.0
+            self.alpha = 1.0
+            return 0
+        step = 1.0 / self.sim.tick_rate
+        self._accumulator += min(elapsed, MAX_FRAME_TIME)
+        ticks = 0
+        while self._accumulator >= step and self.sim.lives > 0:
+            self.update(tower_timings)
+            self._accumulator -= step
+            ticks += 1
+        self.alpha = self._accumulator / step
+        return ticks
+
+    def update(self, tower_timings=None):
         if self.paused:
             return
-            
-        # 波次生成
-        if len(self.enemies) == 0:
-            self.spawn_wave()
-        
-        # 敌人更新
-        for enemy in self.enemies[:]:
-            if not enemy.update(self):
-                self.enemies.remove(enemy)
-        
-        # 防御塔攻击和子弹更新
-        for tower in self.towers:
-            target = tower.attack(self.enemies)
-            if target:
-                if 'explode' in self.res.sounds:
-                    self.res.sounds['explode'].play()
-            
-            # 更新子弹并检查是否击中敌人
-            if killed_enemy := tower.update_projectiles(self.enemies):
-                self.money += 20
+        
+        fired = self.sim.update(tower_timings)
+        if self.recorder:
+            self.recorder.after_update(self.sim)
+        if fired:
+            self._play('explode', fired)
 
-    def spawn_wave(self):
-        enemy_count = min(5 + self.wave * 2, 20)
-        for _ in range(enemy_count):
-            enemy_type = 'enemy1' if random.random() < 0.7 else 'enemy2'
-            self.enemies.append(Enemy(self.path, enemy_type))
-        self.wave += 1
+    def _play(self, name, count=1):
+        if self.sfx:
+            self.sfx.trigger(name, count)
 
     def draw(self):
+        self.res.poll()  # 收取后台加载完成的资源
+        if self.dirty_rects:
+            self._draw_dirty()
+            return
+        
+        static_blits = self._draw_static(self.screen)
+        sprite_rects = self._draw_sprites(self.screen)
+        hud_rects = self._draw_hud(self.screen)
+        self.blits = static_blits + len(sprite_rects) + len(hud_rects)
+        pygame.display.flip()
+
+    def _draw_static(self, surface):
+        # 返回绘制调用次数
         # 绘制背景
         if 'background' in self.res.images:
-            self.screen.blit(self.res.images['background'], (0, 0))
+            surface.blit(self.res.images['background'], (0, 0))
         else:
-            self.screen.fill((100, 200, 100))
+            surface.fill((100, 200, 100))
         
         # 绘制路径
-        self.path.draw(self.screen)
+        self.sim.path.draw(surface)
         
         # 绘制可建造网格
-        for area in self.buildable_grid:
-            pygame.draw.rect(self.screen, (100, 255, 100, 30), area, 1)
+        surface.blit(self._grid_overlay(surface.get_size()), (0, 0))
         
         # 绘制防御塔
-        for tower in self.towers:
-            tower.draw(self.screen, self.res)
-        
-        # 绘制敌人
-        for enemy in self.enemies:
-            enemy.draw(self.screen, self.res)
-        
-        # 绘制UI
-        texts = [
-            (f"波次: {self.wave}", (10, 10)),
-            (f"金钱: ${self.money}", (10, 50)),
-            (f"生命: {self.lives}", (10, 90))
-        ]
-        for text, pos in texts:
-            text_surface = self.res.font.render(text, True, (0, 0, 0))
-            self.screen.blit(text_surface, pos)
+        sprites = [tower.sprite_blit(self.res) for tower in self.sim.towers]
+        surface.blits([s for s in sprites if s], doreturn=0)
         
         # 塔选择按钮
         buttons = [
@@ -212,40 +239,177 @@ class Game:
             ((50, 200, 50), "箭塔(3)", (700, 180))
         ]
         for color, text, pos in buttons:
-            pygame.draw.rect(self.screen, color, (*pos, 90, 30))
-            text_surface = self.res.font.render(text, True, (255, 255, 255))
-            self.screen.blit(text_surface, (pos[0]+5, pos[1]+5))
+            pygame.draw.rect(surface, color, (*pos, 90, 30))
+            text_surface = self.res.render_text(text, (255, 255, 255))
+            surface.blit(text_surface, (pos[0]+5, pos[1]+5))
+        return 1 + len(self.sim.path.points) - 1 + 1 + len(self.sim.towers) + 2 * len(buttons)
+
+    def _grid_overlay(self, size):
+        # 网格线只在可建造区域或窗口尺寸变化时重新绘制到透明图层上
+        grid = self.sim.buildable_grid
+        layer = self._grid_layer
+        if layer is None or self._grid_source is not grid or layer.get_size() != size:
+            layer = pygame.Surface(size, pygame.SRCALPHA)
+            for area in grid:
+                pygame.draw.rect(layer, (100, 255, 100), area, 1)
+            self._grid_layer = layer
+            self._grid_source = grid
+        return layer
+
+    def _draw_sprites(self, surface):
+        # 绘制移动物体，返回各自的绘制区域
+        # 所有图片按原有顺序收集后通过一次Surface.blits完成
+        blits = []
+        
+        # 防御塔攻击范围
+        for tower in self.sim.towers:
+            if tower.show_range:
+                blits.append(tower.range_blit(self.res))
+        
+        # 绘制子弹和敌人，位置按alpha在上一tick与当前tick之间插值
+        lag = 1.0 - self.alpha
+        blits.extend(self.sim.projectiles.blit_sequence(self.res, lag))
+        blits.extend(enemy_blits(self.sim.enemies, self.res, self._enemy_positions(lag)))
+        return surface.blits(blits)
+
+    def _enemy_positions(self, lag):
+        # 敌人沿路径匀速前进，回退lag步后重新查表即为插值位置（拐角处不会抄近路）
+        sim = self.sim
+        n = len(sim.enemies)
+        if lag <= 0 or n == 0:
+            return None
+        if sim.enemy_store:
+            distance = sim.enemy_store.distance[:n]
+            speed = sim.enemy_store.speed[:n]
+        else:
+            distance = np.fromiter((e.distance for e in sim.enemies), np.float64, n)
+            speed = np.fromiter((e.speed for e in sim.enemies), np.float64, n)
+        xs, ys = sim.path.positions_at(np.maximum(distance - speed * sim.dt * lag, 0.0))
+        return xs.tolist(), ys.tolist()
+
+    def _draw_hud(self, surface):
+        # 绘制UI，返回各文字的绘制区域
+        rects = []
+        texts = [
+            (f"波次: {self.sim.wave}", (10, 10)),
+            (f"金钱: ${self.sim.money}", (10, 50)),
+            (f"生命: {self.sim.lives}", (10, 90))
+        ]
+        for text, pos in texts:
+            text_surface = self.res.render_text(text, (0, 0, 0))
+            rects.append(surface.blit(text_surface, pos))
         
         # 显示当前选择的防御塔名称
         if self.selected_tower_type:
             try:
                 text = f"已选择: {self.tower_names[self.selected_tower_type]}"
-                text_surface = self.res.font.render(text, True, (255,0,0))  # 红色文字
+                text_surface = self.res.render_text(text, (255,0,0))  # 红色文字
             
                 # 绘制半透明背景框
-                bg_rect = pygame.Rect(650, 220, 140, 30)
-                bg_surface = pygame.Surface((140,30), pygame.SRCALPHA)
-                bg_surface.fill((255,255,255,128))  # 半透明白色
-                self.screen.blit(bg_surface, (650,220))
+                bg_surface = self.res.get_filled((140,30), (255,255,255,128))  # 半透明白色
+                rects.append(surface.blit(bg_surface, (650,220)))
             
-                self.screen.blit(text_surface, (650, 220))
+                rects.append(surface.blit(text_surface, (650, 220)))
             except Exception as e:
                 print(f"文字渲染失败: {e}")
                 
         # 显示暂停状态
         if self.paused:
-            pause_text = self.res.font.render("游戏暂停(按空格键继续)", True, (255, 0, 0))
-            text_rect = pause_text.get_rect(center=(self.screen.get_width()//2, 30))
-            self.screen.blit(pause_text, text_rect)
+            pause_text = self.res.render_text("游戏暂停(按空格键继续)", (255, 0, 0))
+            text_rect = pause_text.get_rect(center=(surface.get_width()//2, 30))
+            rects.append(surface.blit(pause_text, text_rect))
+        
+        # 性能叠加层
+        if self.profiler and self.profiler.overlay:
+            rects.extend(self.profiler.draw(surface, self.res))
+        return rects
 
-        pygame.display.flip()
+    def _draw_dirty(self):
+        # 局部刷新模式：静态图层预先合成，只重绘并提交变化的区域
+        screen = self.screen
+        layer_key = (screen.get_size(), len(self.sim.towers), self.res.version)
+        if self._static_layer is None or self._static_key != layer_key:
+            # 静态图层只在建塔、窗口变化或资源加载完成时重建
+            self._static_layer = pygame.Surface(screen.get_size()).convert()
+            self._static_key = layer_key
+            self._draw_static(self._static_layer)
+            screen.blit(self._static_layer, (0, 0))
+            self._sprite_rects = self._draw_sprites(screen)
+            self._hud_rects = self._draw_hud(screen)
+            self._hud_state = self._hud_signature()
+            self.blits = 1 + len(self._sprite_rects) + len(self._hud_rects)
+            pygame.display.flip()
+            return
+        
+        # 用静态图层擦除上一帧的移动物体和UI
+        static = self._static_layer
+        previous = self._sprite_rects + self._hud_rects
+        for rect in previous:
+            screen.blit(static, rect, rect)
+        
+        sprite_rects = self._draw_sprites(screen)
+        hud_rects = self._draw_hud(screen)
+        dirty = self._sprite_rects + sprite_rects
+        # UI内容未变化时，重绘结果与屏幕上已有的像素相同，无需提交
+        hud_state = self._hud_signature()
+        if hud_state != self._hud_state:
+            dirty += self._hud_rects + hud_rects
+            self._hud_state = hud_state
+        self._sprite_rects = sprite_rects
+        self._hud_rects = hud_rects
+        self.blits = len(previous) + len(sprite_rects) + len(hud_rects)
+        pygame.display.update(dirty)
+
+    def _hud_signature(self):
+        overlay = self.profiler.overlay_signature() if self.profiler else None
+        return (self.sim.wave, self.sim.money, self.sim.lives, self.selected_tower_type,
+                self.paused, overlay)
 
     def run(self):
+        # 主循环；启用性能分析时额外记录各阶段耗时和每帧计数，未启用时每帧只多几次判断
+        self.draw()
+        startup.finish()
+        clock = time.perf_counter
+        profiler = self.profiler
+        tower_timings = {} if profiler else None
         running = True
-        while running and self.lives > 0:
+        last = clock()
+        while running and self.sim.lives > 0:
+            sim = self.sim
+            if profiler:
+                checks = sim.enemy_index.checks + sim.projectiles.checks
+                t0 = clock()
             running = self.handle_events()
-            if not self.paused:
-                self.update()
+            t1 = clock()
+            self.advance(t1 - last, tower_timings)
+            last = t1
+            if self.sfx:
+                self.sfx.flush()
+            if self.stream:
+                self.stream.publish(sim)
+            if profiler:
+                t2 = clock()
             self.draw()
-            self.clock.tick(60)
+            if profiler:
+                t3 = clock()
+                profiler.record(
+                    frame_ms=(t3 - t0) * 1000,
+                    events_ms=(t1 - t0) * 1000,
+                    update_ms=(t2 - t1) * 1000,
+                    draw_ms=(t3 - t2) * 1000,
+                    enemies=len(sim.enemies),
+                    projectiles=sim.projectiles.count,
+                    distance_checks=sim.enemy_index.checks + sim.projectiles.checks - checks,
+                    blits=self.blits
+                )
+                profiler.add_tower_time(tower_timings)
+                tower_timings.clear()
+            self.clock.tick(self.fps)
+        self._close()
+
+    def _close(self):
+        if self.recorder:
+            self.recorder.close(self.sim)
+        if self.stream:
+            self.stream.close()
         pygame.quit()
\ No newline at end of file
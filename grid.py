@@ -0,0 +1,87 @@
+import pygame
+
+PATH = 1   # 路径占用，不可建造
+FREE = 0   # 空闲，可建造
+TOWER = 2  # 已建造防御塔
+
+class BuildGrid:
+    # 按格子下标存储的占用表：路径掩码、空闲格子和每格上的防御塔
+    def __init__(self, path, screen_size, cell_size=40, margin=None):
+        self.cell_size = cell_size
+        self.cols = screen_size[0] // cell_size
+        self.rows = screen_size[1] // cell_size
+        self.state = bytearray(self.cols * self.rows)
+        self.towers = [None] * (self.cols * self.rows)
+        if margin is None:
+            margin = path.width // 2 + 15
+        self._mark_path(path, margin)
+
+    @classmethod
+    def from_mask(cls, path_mask, cols, rows, cell_size):
+        # 由关卡文件中预计算的路径掩码（每格一个bool）建立占用表，跳过逐格计算
+        grid = cls.__new__(cls)
+        grid.cell_size = cell_size
+        grid.cols = cols
+        grid.rows = rows
+        grid.state = bytearray(bytes(path_mask[:cols * rows].astype('uint8') * PATH))
+        grid.towers = [None] * (cols * rows)
+        return grid
+
+    def _mark_path(self, path, margin):
+        # 格子中心到任一路段（线段而非直线）的距离小于margin即视为路径
+        half = self.cell_size / 2
+        m2 = margin * margin
+        segments = list(zip(path.points, path.points[1:]))
+        for row in range(self.rows):
+            cy = row * self.cell_size + half
+            for col in range(self.cols):
+                cx = col * self.cell_size + half
+                if any(_segment_dist2(cx, cy, p1, p2) < m2 for p1, p2 in segments):
+                    self.state[row * self.cols + col] = PATH
+
+    def cell_at(self, x, y):
+        # 像素坐标所在格子，超出范围返回None
+        col, row = int(x // self.cell_size), int(y // self.cell_size)
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return col, row
+        return None
+
+    def can_build(self, col, row):
+        return 0 <= col < self.cols and 0 <= row < self.rows and \
+            self.state[row * self.cols + col] == FREE
+
+    def place(self, col, row, tower):
+        i = row * self.cols + col
+        self.state[i] = TOWER
+        self.towers[i] = tower
+
+    def tower_at(self, x, y):
+        cell = self.cell_at(x, y)
+        if cell is None:
+            return None
+        return self.towers[cell[1] * self.cols + cell[0]]
+
+    def free_cells(self):
+        # 可以建塔的格子坐标(列, 行)，按行优先顺序
+        return [
+            (col, row) for row in range(self.rows) for col in range(self.cols)
+            if self.state[row * self.cols + col] == FREE
+        ]
+
+    def buildable_rects(self):
+        # 所有非路径格子（含已建塔格子），用于绘制网格
+        size = self.cell_size
+        return [
+            pygame.Rect(col * size, row * size, size, size)
+            for col in range(self.cols) for row in range(self.rows)
+            if self.state[row * self.cols + col] != PATH
+        ]
+
+def _segment_dist2(px, py, p1, p2):
+    # 点到线段距离的平方
+    (x1, y1), (x2, y2) = p1, p2
+    dx, dy = x2 - x1, y2 - y1
+    length2 = dx*dx + dy*dy
+    t = 0.0 if length2 == 0 else max(0.0, min(1.0, ((px - x1)*dx + (py - y1)*dy) / length2))
+    ex, ey = x1 + t*dx - px, y1 + t*dy - py
+    return ex*ex + ey*ey
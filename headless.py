@@ -0,0 +1,90 @@
+import argparse
+import json
+import time
+
+from simulation import Simulation
+from waves import load_waves
+from level import load_level
+
+def parse_placement(text):
+    # 格式: 类型:列,行[@帧]，例如 basic:5,3 或 cannon:10,12@600
+    tower_type, _, rest = text.partition(':')
+    cell, _, tick = rest.partition('@')
+    col, row = (int(v) for v in cell.split(','))
+    return (int(tick) if tick else 0, tower_type, col, row)
+
+def run_headless(seed=0, placements=(), max_ticks=36000, max_waves=None, batched_enemies=False,
+                 params=None, waves=None, level=None):
+    """无显示模式下尽可能快地推进模拟，返回结果统计
+    placements为(帧, 塔类型, 列, 行)序列，到达对应帧时按网格坐标建造
+    params为平衡参数，见Simulation.apply_params；waves为波次配置，见waves.py
+    level为编译后的关卡文件名，同一进程内只映射一次"""
+    sim = Simulation(seed=seed, batched_enemies=batched_enemies, params=params, waves=waves,
+                     level=load_level(level) if level else None)
+    pending = sorted(placements)
+    built = 0
+    start_lives = sim.lives
+    money_curve = []  # 每波开始时的金钱
+
+    start = time.perf_counter()
+    while sim.lives > 0 and sim.tick < max_ticks:
+        if max_waves is not None and sim.wave > max_waves and sim.wave_cleared():
+            break
+        if sim.waves and sim.waves.finished and sim.wave_cleared():
+            break  # 波次文件中的波次已全部守住
+        while pending and pending[0][0] <= sim.tick:
+            _, tower_type, col, row = pending.pop(0)
+            if sim.build_tower(tower_type, col * sim.grid_size, row * sim.grid_size):
+                built += 1
+        wave = sim.wave
+        sim.update()
+        if sim.wave != wave:
+            money_curve.append(sim.money)
+    elapsed = time.perf_counter() - start
+
+    # 已生成的波次中，最后一波若仍有敌人存活或导致失败则不计为守住
+    waves_survived = sim.wave - 1
+    if not sim.wave_cleared() or sim.lives <= 0:
+        waves_survived -= 1
+
+    return {
+        "seed": seed,
+        "outcome": "defeated" if sim.lives <= 0 else "survived",
+        "ticks": sim.tick,
+        "wave": sim.wave,
+        "money": sim.money,
+        "lives": sim.lives,
+        "lives_lost": start_lives - sim.lives,
+        "waves_survived": max(waves_survived, 0),
+        "money_curve": money_curve,
+        "towers_built": built,
+        "kills": sim.kills,
+        "elapsed": elapsed,
+        "ticks_per_second": sim.tick / elapsed if elapsed > 0 else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="无显示模拟运行器")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--ticks', type=int, default=36000, help="最多模拟的帧数")
+    parser.add_argument('--waves', type=int, default=None, help="完成该波次后停止")
+    parser.add_argument('--place', action='append', default=[], type=parse_placement,
+                        metavar='TYPE:COL,ROW[@TICK]', help="脚本化建造防御塔，可重复")
+    parser.add_argument('--batched-enemies', action='store_true',
+                        help="使用NumPy批量敌人引擎")
+    parser.add_argument('--params', metavar='FILE', help="平衡参数JSON文件")
+    parser.add_argument('--waves-file', metavar='FILE', help="波次文件，见waves.py")
+    parser.add_argument('--level', metavar='FILE', help="编译后的关卡文件，见level.py")
+    args = parser.parse_args()
+
+    params = None
+    if args.params:
+        with open(args.params, encoding='utf-8') as f:
+            params = json.load(f)
+    waves = load_waves(args.waves_file) if args.waves_file else None
+    result = run_headless(args.seed, args.place, args.ticks, args.waves, args.batched_enemies,
+                          params, waves, args.level)
+    print(json.dumps(result, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
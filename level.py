@@ -0,0 +1,124 @@
+import argparse
+import json
+import mmap
+import struct
+import numpy as np
+from path import Path
+from grid import BuildGrid, PATH
+
+# 编译后的关卡文件：固定长度的文件头之后依次是
+#   路径点 float64[n, 2]、累计长度 float64[n]、单位方向 float64[n-1, 2]、
+#   距离场 float32[rows, cols]（格子中心到路径的距离）、最近点弧长 float32[rows, cols]、
+#   路径掩码（每格1位，按行优先打包）
+# 所有数组都按8字节对齐，加载时直接映射为只读NumPy视图，多个进程共享同一份页面
+MAGIC = b'TDLV'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHHHHHdIxx')  # 魔数, 版本, 屏幕宽高, 格子尺寸, 列数, 行数, 路径宽度, 边距, 路径点数
+
+def compile_level(desc):
+    """把关卡描述（JSON对象）编译为二进制数据
+    desc: points路径点, path_width路径宽度, grid_size格子尺寸, screen_size屏幕尺寸, margin可选"""
+    points = [tuple(p) for p in desc['points']]
+    if len(points) < 2:
+        raise ValueError("路径至少需要两个点")
+    width = desc.get('path_width', 40)
+    grid_size = desc.get('grid_size', 40)
+    screen_w, screen_h = desc.get('screen_size', (800, 600))
+    margin = desc.get('margin', width // 2 + 15)
+    path = Path(points, width)
+    # 与运行时完全相同的逐格计算，只在编译时执行一次
+    grid = BuildGrid(path, (screen_w, screen_h), grid_size, margin)
+    distance, arc = distance_field(path, grid)
+
+    mask = np.frombuffer(bytes(grid.state), dtype=np.uint8) == PATH
+    parts = [
+        HEADER.pack(MAGIC, VERSION, screen_w, screen_h, grid_size, grid.cols, grid.rows, width,
+                    margin, len(points)),
+        np.array(path.points, dtype=np.float64).tobytes(),
+        np.array(path.cum_lengths, dtype=np.float64).tobytes(),
+        np.array(path.directions, dtype=np.float64).tobytes()
+    ]
+    fields = distance.tobytes() + arc.tobytes()
+    parts.append(fields + b'\0' * (-len(fields) % 8))
+    parts.append(np.packbits(mask).tobytes())
+    return b''.join(parts)
+
+def distance_field(path, grid):
+    # 每个格子中心到路径的最短距离，以及路径上最近点的弧长，返回两个float32[rows, cols]
+    half = grid.cell_size / 2
+    cx = np.arange(grid.cols) * grid.cell_size + half
+    cy = np.arange(grid.rows) * grid.cell_size + half
+    px, py = np.meshgrid(cx, cy)
+    best = np.full(px.shape, np.inf)
+    arc = np.zeros(px.shape)
+    for i, ((x1, y1), (x2, y2)) in enumerate(zip(path.points, path.points[1:])):
+        dx, dy = x2 - x1, y2 - y1
+        length2 = dx*dx + dy*dy
+        t = np.zeros(px.shape) if length2 == 0 else \
+            np.clip(((px - x1)*dx + (py - y1)*dy) / length2, 0.0, 1.0)
+        d2 = (x1 + t*dx - px)**2 + (y1 + t*dy - py)**2
+        closer = d2 < best
+        best[closer] = d2[closer]
+        arc[closer] = path.cum_lengths[i] + (t * length2**0.5)[closer]
+    return np.sqrt(best).astype(np.float32), arc.astype(np.float32)
+
+class Level:
+    """通过mmap加载编译后的关卡，数组均为只读视图，不复制文件内容
+    path可在多个Simulation之间共享；占用表会被建塔修改，每次通过new_grid新建"""
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = self._mmap
+        (magic, version, screen_w, screen_h, self.grid_size, self.cols, self.rows,
+         self.path_width, self.margin, n) = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"不是有效的关卡文件: {filename}")
+        self.screen_size = (screen_w, screen_h)
+
+        offset = HEADER.size
+        def view(dtype, shape):
+            nonlocal offset
+            count = int(np.prod(shape))
+            arr = np.frombuffer(buf, dtype=dtype, count=count, offset=offset).reshape(shape)
+            offset += arr.nbytes
+            return arr
+        points = view(np.float64, (n, 2))
+        cum_lengths = view(np.float64, (n,))
+        directions = view(np.float64, (n - 1, 2))
+        self.distance_field = view(np.float32, (self.rows, self.cols))
+        self.arc_field = view(np.float32, (self.rows, self.cols))
+        offset += -offset % 8
+        self.path_mask = np.unpackbits(view(np.uint8, ((self.rows * self.cols + 7) // 8,)))
+        # 路径表只有几个点，转成列表供逐个敌人的标量查表使用
+        self.path = Path.from_tables(points.tolist(), cum_lengths.tolist(), directions.tolist(),
+                                     self.path_width)
+
+    def new_grid(self):
+        return BuildGrid.from_mask(self.path_mask, self.cols, self.rows, self.grid_size)
+
+_loaded = {}
+
+def load_level(filename):
+    # 同一进程内重复加载同一文件时复用已有映射（批量模拟的工作进程会多次加载）
+    level = _loaded.get(filename)
+    if level is None:
+        level = _loaded[filename] = Level(filename)
+    return level
+
+def main():
+    parser = argparse.ArgumentParser(description="关卡编译器：JSON关卡描述 -> 二进制关卡文件")
+    parser.add_argument('source', help="关卡描述JSON（points、path_width、grid_size、screen_size）")
+    parser.add_argument('output', help="输出的二进制关卡文件")
+    args = parser.parse_args()
+    with open(args.source, encoding='utf-8') as f:
+        data = compile_level(json.load(f))
+    with open(args.output, 'wb') as f:
+        f.write(data)
+    level = Level(args.output)
+    free = level.cols * level.rows - int(level.path_mask[:level.cols * level.rows].sum())
+    print(f"{args.output}: {len(data)}字节，{level.cols}x{level.rows}格，可建造{free}格，"
+          f"路径长度{level.path.length:.1f}")
+
+if __name__ == "__main__":
+    main()
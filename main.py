@@ -1,10 +1,57 @@
-import pygame
+import argparse
+import sys
+import startup
 from game import Game
+from waves import load_waves
 
 def main():
-    pygame.init()
-    game = Game()
+    parser = argparse.ArgumentParser(description="石塔防御战")
+    parser.add_argument('--batched-enemies', action='store_true',
+                        help="使用NumPy批量敌人引擎")
+    parser.add_argument('--seed', type=int, default=None, help="随机种子")
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help="预合成静态图层并只刷新变化区域（适合低端设备）")
+    parser.add_argument('--profile', action='store_true',
+                        help="启用帧性能分析（F3切换叠加层）")
+    parser.add_argument('--profile-out', metavar='FILE',
+                        help="退出时导出性能数据（.csv或.json），隐含--profile")
+    parser.add_argument('--mute', action='store_true', help="不加载也不播放任何音频")
+    parser.add_argument('--audio-stats', action='store_true',
+                        help="退出时输出音效播放、合并和丢弃的次数")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="首帧绘制后输出启动耗时报告")
+    parser.add_argument('--tick-rate', type=int, default=60,
+                        help="模拟频率（每秒tick数），可低于渲染帧率以节省CPU")
+    parser.add_argument('--fps', type=int, default=60, help="渲染帧率上限")
+    parser.add_argument('--level', metavar='FILE',
+                        help="编译后的关卡文件（用level.py从JSON关卡描述生成）")
+    parser.add_argument('--waves', metavar='FILE',
+                        help="波次文件（JSON），敌人按时间线分散生成")
+    parser.add_argument('--endless', action='store_true',
+                        help="无尽模式：波次用完后敌人数持续增长")
+    parser.add_argument('--stream-port', type=int, default=None,
+                        help="在本机该端口推送对局状态（0为自动分配），用stream.py连接")
+    parser.add_argument('--stream-rate', type=int, default=20, help="状态推送频率（次/秒）")
+    parser.add_argument('--record', metavar='FILE',
+                        help="录制回放（种子+输入事件+定期快照），用replay.py回放")
+    args = parser.parse_args()
+    startup.report_enabled = args.startup_report
+    
+    profiler = None
+    if args.profile or args.profile_out:
+        from profiler import FrameProfiler
+        profiler = FrameProfiler()
+    
+    game = Game(batched_enemies=args.batched_enemies, seed=args.seed,
+                dirty_rects=args.dirty_rects, profiler=profiler, audio=not args.mute,
+                record=args.record, tick_rate=args.tick_rate, fps=args.fps,
+                waves=load_waves(args.waves) if args.waves else None, endless=args.endless,
+                level=args.level, stream_port=args.stream_port, stream_rate=args.stream_rate)
     game.run()
+    if args.audio_stats and game.sfx:
+        print(game.sfx.report(), file=sys.stderr)
+    if args.profile_out:
+        profiler.export(args.profile_out)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
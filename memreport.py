@@ -0,0 +1,95 @@
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from simulation import Simulation, TOWER_CLASSES
+from enemy import Enemy
+from projectile import ARRAYS
+
+def entity_sizes(sim):
+    # 每个实体的内存占用（字节）；子弹保存在预分配数组中，按每个槽位的字节数计算
+    # 测量用的敌人单独创建，不经过对象池，以免影响池的统计
+    projectiles = sim.projectiles
+    tower = TOWER_CLASSES['basic'](0, 0)
+    enemy = Enemy(sim.path, 'enemy1', random.Random(0))
+    return {
+        "enemy": sys.getsizeof(enemy),
+        "tower": sys.getsizeof(tower) + sys.getsizeof(tower.rect),
+        "projectile_slot": sum(getattr(projectiles, name).itemsize for name in ARRAYS)
+    }
+
+def run_memory_check(seed=0, waves=1000, towers=12, sample_every=50, trace=False):
+    """无显示运行指定波数，定期采样内存，检查长时间运行时内存是否保持平稳
+    生命值设为极大值，保证能跑满全部波次"""
+    sim = Simulation(seed=seed, params={'lives': 10**9, 'money': 10**9})
+    rng = random.Random(seed)
+    names = sorted(TOWER_CLASSES)
+    for rect in rng.sample(sim.buildable_grid, min(towers, len(sim.buildable_grid))):
+        sim.build_tower(rng.choice(names), *rect.topleft)
+
+    if trace:
+        tracemalloc.start()
+    samples = []
+    gc_before = sum(s['collections'] for s in gc.get_stats())
+    start = time.perf_counter()
+    last_tick = 0
+    last_created = 0
+    while sim.wave <= waves:
+        wave = sim.wave
+        sim.update()
+        if sim.wave != wave and (wave % sample_every == 0 or wave == 1):
+            # 每隔若干波在新一波生成时采样一次
+            pool = sim.enemy_pool
+            ticks = sim.tick - last_tick
+            sample = {
+                "wave": wave,
+                "tick": sim.tick,
+                "allocated_blocks": sys.getallocatedblocks(),
+                "enemy_allocs_per_tick": (pool.created - last_created) / ticks if ticks else 0.0,
+                "pool_free": len(pool.free),
+                "projectile_capacity": sim.projectiles.capacity
+            }
+            if trace:
+                sample["traced_bytes"] = tracemalloc.get_traced_memory()[0]
+            samples.append(sample)
+            last_tick, last_created = sim.tick, pool.created
+    elapsed = time.perf_counter() - start
+    if trace:
+        tracemalloc.stop()
+
+    pool = sim.enemy_pool
+    # 以第二个采样点为基准（第一波之后对象池和缓存已建立），比较末尾的增长
+    base = samples[min(1, len(samples) - 1)]
+    return {
+        "seed": seed,
+        "waves": waves,
+        "ticks": sim.tick,
+        "entity_bytes": entity_sizes(sim),
+        "enemies_created": pool.created,
+        "enemies_reused": pool.reused,
+        "enemy_allocs_per_tick": pool.created / sim.tick,
+        "gc_collections_per_1000_ticks":
+            (sum(s['collections'] for s in gc.get_stats()) - gc_before) * 1000 / sim.tick,
+        "allocated_blocks_growth": samples[-1]["allocated_blocks"] - base["allocated_blocks"],
+        "ticks_per_second": sim.tick / elapsed if elapsed > 0 else 0.0,
+        "samples": samples
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="长时间运行的内存与分配统计")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--waves', type=int, default=1000, help="模拟的波数")
+    parser.add_argument('--towers', type=int, default=12, help="随机建造的防御塔数")
+    parser.add_argument('--sample-every', type=int, default=50, help="每隔多少波采样一次")
+    parser.add_argument('--trace', action='store_true',
+                        help="使用tracemalloc统计字节数（明显变慢）")
+    args = parser.parse_args()
+    result = run_memory_check(args.seed, args.waves, args.towers, args.sample_every, args.trace)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
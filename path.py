@@ -1,14 +1,69 @@
 import pygame
+import math
+import numpy as np
+from bisect import bisect_right
+
+# 默认关卡的S形路径点
+DEFAULT_POINTS = [
+    (0, 300), (200, 300), (200, 150),
+    (400, 150), (400, 450), (600, 450),
+    (600, 300), (800, 300)
+]
 
 class Path:
-    def __init__(self):
-        # S形路径点
-        self.points = [
-            (0, 300), (200, 300), (200, 150),
-            (400, 150), (400, 450), (600, 450),
-            (600, 300), (800, 300)
-        ]
-        self.width = 40
+    def __init__(self, points=None, width=40):
+        self.points = [tuple(p) for p in (points or DEFAULT_POINTS)]
+        self.width = width
+        self._build_tables()
+    
+    @classmethod
+    def from_tables(cls, points, cum_lengths, directions, width):
+        # 使用关卡文件中预计算好的查找表，跳过_build_tables
+        path = cls.__new__(cls)
+        path.points = [tuple(p) for p in points]
+        path.width = width
+        path.cum_lengths = list(cum_lengths)
+        path.directions = [tuple(d) for d in directions]
+        path.length = path.cum_lengths[-1]
+        path._arrays = None
+        return path
+        
+    def _build_tables(self):
+        # 按弧长参数化路径：预计算各段累计长度和单位方向向量
+        self.cum_lengths = [0.0]
+        self.directions = []
+        for (x1, y1), (x2, y2) in zip(self.points, self.points[1:]):
+            length = math.hypot(x2 - x1, y2 - y1)
+            self.cum_lengths.append(self.cum_lengths[-1] + length)
+            self.directions.append(((x2 - x1) / length, (y2 - y1) / length))
+        self.length = self.cum_lengths[-1]
+        self._arrays = None
+        
+    def segment_at(self, distance):
+        # 二分查找距离所在的路段下标
+        i = bisect_right(self.cum_lengths, distance) - 1
+        return min(max(i, 0), len(self.directions) - 1)
+        
+    def position_at(self, distance):
+        # 沿路径行进distance后的坐标
+        i = self.segment_at(distance)
+        x, y = self.points[i]
+        dx, dy = self.directions[i]
+        offset = distance - self.cum_lengths[i]
+        return (x + dx * offset, y + dy * offset)
+        
+    def positions_at(self, distances):
+        # position_at的向量化版本，distances为数组，返回(xs, ys)数组
+        if self._arrays is None:
+            self._arrays = (np.array(self.points, dtype=np.float64),
+                            np.array(self.cum_lengths, dtype=np.float64),
+                            np.array(self.directions, dtype=np.float64))
+        points, cum_lengths, directions = self._arrays
+        seg = np.searchsorted(cum_lengths, distances, side='right') - 1
+        np.clip(seg, 0, len(directions) - 1, out=seg)
+        offset = distances - cum_lengths[seg]
+        return (points[seg, 0] + directions[seg, 0] * offset,
+                points[seg, 1] + directions[seg, 1] * offset)
         
     def draw(self, surface):
         for i in range(len(self.points)-1):
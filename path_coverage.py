@@ -0,0 +1,78 @@
+import math
+import numpy as np
+
+class CoverageIndex:
+    """预计算的覆盖索引：每个可建造格子放置每种防御塔时，射程覆盖的路径弧长区间
+    区间以沿路径的距离表示，与Enemy.distance同一坐标；另按固定步长离散为覆盖矩阵，
+    用于批量评估布局"""
+    def __init__(self, path, grid, towers, bin_size=4.0):
+        # towers: {塔类型: (射程, 伤害, 冷却帧数)}
+        self.path = path
+        self.cells = grid.free_cells()
+        self.kinds = sorted(towers)
+        self.towers = towers
+        self.bin_size = bin_size
+        self.bins = max(1, math.ceil(path.length / bin_size))
+        half = grid.cell_size / 2
+        self.intervals = {}
+        for col, row in self.cells:
+            cx, cy = col * grid.cell_size + half, row * grid.cell_size + half
+            for kind in self.kinds:
+                self.intervals[(col, row), kind] = path_intervals(path, cx, cy, towers[kind][0])
+        self._build_matrix()
+
+    @classmethod
+    def from_simulation(cls, sim, bin_size=4.0):
+        # 按模拟中的塔属性（含tower_stats覆盖）建立索引
+        from simulation import TOWER_CLASSES
+        towers = {}
+        for name, tower_class in TOWER_CLASSES.items():
+            tower = tower_class(0, 0)
+            for attr, value in sim.tower_stats.get(name, {}).items():
+                setattr(tower, attr, value)
+            towers[name] = (tower.range, tower.damage, tower.cooldown_max)
+        return cls(sim.path, sim.grid, towers, bin_size)
+
+    def _build_matrix(self):
+        # options[i] = (格子, 塔类型)；matrix[i, b]为该选项在第b段路径上每帧的平均伤害乘以
+        # 该段被覆盖的长度，即以单位速度通过时受到的伤害
+        self.options = [(cell, kind) for cell in self.cells for kind in self.kinds]
+        self.matrix = np.zeros((len(self.options), self.bins), dtype=np.float32)
+        edges = np.arange(self.bins + 1) * self.bin_size
+        for i, (cell, kind) in enumerate(self.options):
+            _, damage, cooldown = self.towers[kind]
+            rate = damage / (cooldown + 1)  # 冷却结束的那一帧开火，周期为cooldown+1帧
+            row = self.matrix[i]
+            for start, end in self.intervals[cell, kind]:
+                overlap = np.minimum(edges[1:], end) - np.maximum(edges[:-1], start)
+                row += rate * np.clip(overlap, 0, None)
+
+    def coverage(self, cell, kind):
+        return self.intervals[cell, kind]
+
+    def covered_length(self, cell, kind):
+        return sum(end - start for start, end in self.intervals[cell, kind])
+
+def path_intervals(path, cx, cy, radius):
+    """圆心(cx, cy)、半径radius的圆覆盖的路径区间，返回按距离排序且互不重叠的[(起点, 终点)]
+    逐段求线段与圆的交集，相邻段在拐点处相接的区间合并为一个"""
+    intervals = []
+    r2 = radius * radius
+    for i, ((x, y), (dx, dy)) in enumerate(zip(path.points, path.directions)):
+        seg_len = path.cum_lengths[i + 1] - path.cum_lengths[i]
+        # |P + t*d - C|^2 <= r^2 关于t的二次不等式
+        b = (x - cx) * dx + (y - cy) * dy
+        c = (x - cx) ** 2 + (y - cy) ** 2 - r2
+        disc = b * b - c
+        if disc < 0:
+            continue
+        root = math.sqrt(disc)
+        t0, t1 = max(-b - root, 0.0), min(-b + root, seg_len)
+        if t0 > t1:
+            continue
+        start, end = path.cum_lengths[i] + t0, path.cum_lengths[i] + t1
+        if intervals and start - intervals[-1][1] <= 1e-9:
+            intervals[-1] = (intervals[-1][0], end)
+        else:
+            intervals.append((start, end))
+    return intervals
@@ -0,0 +1,109 @@
+import csv
+import json
+import time
+import numpy as np
+
+# 环形缓冲区中每帧记录的字段
+FIELDS = ('frame_ms', 'events_ms', 'update_ms', 'draw_ms',
+          'enemies', 'projectiles', 'distance_checks', 'blits')
+
+class FrameProfiler:
+    # 帧性能分析器：按阶段计时并记录每帧计数，保存在固定大小的环形缓冲区中
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.samples = np.zeros((capacity, len(FIELDS)), dtype=np.float64)
+        self.frames = 0
+        self.tower_ms = {}  # 各类防御塔的累计索敌/开火耗时
+        self.overlay = False
+        self._overlay_lines = []
+
+    def record(self, **values):
+        row = self.samples[self.frames % self.capacity]
+        row[:] = 0
+        for i, name in enumerate(FIELDS):
+            if name in values:
+                row[i] = values[name]
+        self.frames += 1
+        if self.overlay and self.frames % 30 == 0:
+            self._overlay_lines = self._summary_lines()
+
+    def add_tower_time(self, timings):
+        for kind, seconds in timings.items():
+            self.tower_ms[kind] = self.tower_ms.get(kind, 0.0) + seconds * 1000
+
+    def recent(self):
+        # 按时间顺序返回缓冲区内的有效记录
+        n = min(self.frames, self.capacity)
+        if self.frames <= self.capacity:
+            return self.samples[:n]
+        start = self.frames % self.capacity
+        return np.concatenate((self.samples[start:], self.samples[:start]))
+
+    def percentiles(self, field='frame_ms', q=(50, 99)):
+        data = self.recent()
+        if len(data) == 0:
+            return [0.0 for _ in q]
+        return np.percentile(data[:, FIELDS.index(field)], q).tolist()
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self._overlay_lines = self._summary_lines() if self.overlay else []
+
+    def _summary_lines(self):
+        data = self.recent()
+        if len(data) == 0:
+            return []
+        p50, p99 = self.percentiles()
+        mean = data.mean(axis=0)
+        last = data[-1]
+        col = FIELDS.index
+        lines = [
+            f"frame p50 {p50:.1f}ms p99 {p99:.1f}ms",
+            f"events {mean[col('events_ms')]:.2f} update {mean[col('update_ms')]:.2f} "
+            f"draw {mean[col('draw_ms')]:.2f} ms",
+            f"enemies {int(last[col('enemies')])} projectiles {int(last[col('projectiles')])}",
+            f"checks {int(last[col('distance_checks')])} blits {int(last[col('blits')])}"
+        ]
+        total = self.frames or 1
+        for kind, ms in sorted(self.tower_ms.items()):
+            lines.append(f"{kind} {ms / total:.3f}ms")
+        return lines
+
+    def draw(self, surface, res_manager):
+        # 绘制性能叠加层，返回绘制区域
+        rects = []
+        y = surface.get_height() - 24 * len(self._overlay_lines) - 10
+        for line in self._overlay_lines:
+            rects.append(surface.blit(res_manager.render_text(line, (255, 255, 0)), (10, y)))
+            y += 24
+        return rects
+
+    def overlay_signature(self):
+        return tuple(self._overlay_lines)
+
+    def export_csv(self, path):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            writer.writerows(self.recent().tolist())
+
+    def export_json(self, path):
+        p50, p99 = self.percentiles()
+        data = {
+            "exported_at": time.time(),
+            "frames": self.frames,
+            "frame_ms_p50": p50,
+            "frame_ms_p99": p99,
+            "tower_ms": self.tower_ms,
+            "fields": FIELDS,
+            "samples": self.recent().tolist()
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    def export(self, path):
+        # 按扩展名选择导出格式
+        if path.endswith('.csv'):
+            self.export_csv(path)
+        else:
+            self.export_json(path)
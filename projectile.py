@@ -0,0 +1,192 @@
+import pygame
+import numpy as np
+
+HIT_RADIUS = 20  # 子弹击中判定距离
+ARRIVE_RADIUS = 5  # 到达目标位置判定距离
+ARRAYS = ('x', 'y', 'target_x', 'target_y', 'vx', 'vy', 'damage', 'style', 'kind')
+
+class ProjectileManager:
+    # 全局子弹管理器：预分配数组存放所有子弹，每帧一次批量移动并结算命中
+    def __init__(self, capacity=1024):
+        self.count = 0
+        self.styles = []  # (颜色, 半径)，按编号引用
+        self.kinds = []   # 发射子弹的塔类型名，按编号引用
+        self.checks = 0   # 累计的命中距离比较次数，供性能分析读取
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = self.count
+        def grow(name, dtype):
+            arr = np.zeros(capacity, dtype=dtype)
+            if old:
+                arr[:old] = getattr(self, name)[:old]
+            setattr(self, name, arr)
+        for name in ('x', 'y', 'target_x', 'target_y', 'vx', 'vy', 'damage'):
+            grow(name, np.float64)
+        grow('style', np.int16)
+        grow('kind', np.int16)
+        self.capacity = capacity
+
+    def _intern(self, table, value):
+        try:
+            return table.index(value)
+        except ValueError:
+            table.append(value)
+            return len(table) - 1
+
+    def spawn(self, start_x, start_y, target_x, target_y, speed, damage, color, radius, kind=None):
+        if self.count == self.capacity:
+            self._allocate(self.capacity * 2)
+        i = self.count
+        self.x[i], self.y[i] = start_x, start_y
+        self.target_x[i], self.target_y[i] = target_x, target_y
+
+        # 计算方向向量
+        dx, dy = target_x - start_x, target_y - start_y
+        dist = (dx**2 + dy**2)**0.5
+        if dist > 0:
+            self.vx[i], self.vy[i] = dx / dist * speed, dy / dist * speed
+        else:
+            self.vx[i], self.vy[i] = 0, 0
+        self.damage[i] = damage
+        self.style[i] = self._intern(self.styles, (tuple(color), radius))
+        self.kind[i] = self._intern(self.kinds, kind)
+        self.count += 1
+
+    def update(self, enemy_x, enemy_y, enemy_health):
+        """移动所有子弹并结算命中，直接扣减enemy_health数组
+        返回(被击中的敌人下标, 本帧被击杀的敌人下标, 击杀者塔类型名列表)"""
+        n = self.count
+        empty = np.zeros(0, dtype=np.intp)
+        if n == 0:
+            return empty, empty, []
+        x, y = self.x[:n], self.y[:n]
+        x += self.vx[:n]
+        y += self.vy[:n]
+
+        # 检查是否到达目标位置；低模拟频率下每步位移可能超过判定直径，
+        # 此时以半步长为判定半径，保证沿直线飞行的子弹不会越过目标
+        vx, vy = self.vx[:n], self.vy[:n]
+        d2 = (self.target_x[:n] - x)**2 + (self.target_y[:n] - y)**2
+        arrived = (d2 < ARRIVE_RADIUS**2) | (d2 <= (vx**2 + vy**2) / 4)
+
+        # 检查是否击中敌人：每颗子弹取列表中最靠前的命中敌人
+        target, checks = _first_hits(x, y, enemy_x, enemy_y, HIT_RADIUS)
+        self.checks += checks
+        hit = target >= 0
+        hit_targets = target[hit]
+
+        before = enemy_health > 0
+        np.subtract.at(enemy_health, hit_targets, self.damage[:n][hit])
+        hit_enemies = np.unique(hit_targets)
+        killed = hit_enemies[before[hit_enemies] & (enemy_health[hit_enemies] <= 0)]
+
+        # 击杀归属于命中该敌人的最后一颗子弹
+        killers = []
+        if len(killed):
+            last_shot = np.full(len(enemy_health), -1, dtype=np.intp)
+            last_shot[hit_targets] = np.flatnonzero(hit)
+            killers = [self.kinds[k] for k in self.kind[last_shot[killed]].tolist()]
+
+        # 批量移除到达或命中的子弹
+        keep = ~(arrived | hit)
+        if not keep.all():
+            self._compact(np.flatnonzero(keep))
+        return hit_enemies, killed, killers
+
+    def _compact(self, keep):
+        k = len(keep)
+        for name in ARRAYS:
+            arr = getattr(self, name)
+            arr[:k] = arr[keep]
+        self.count = k
+
+    def clear(self):
+        self.count = 0
+
+    def get_state(self):
+        # 供Simulation.snapshot使用：各数组的有效部分和样式、塔类型表
+        n = self.count
+        state = {name: getattr(self, name)[:n].tolist() for name in ARRAYS}
+        state['styles'] = self.styles
+        state['kinds'] = self.kinds
+        return state
+
+    def set_state(self, state):
+        n = len(state['x'])
+        capacity = self.capacity
+        while capacity < n:
+            capacity *= 2
+        self.count = 0
+        self._allocate(capacity)
+        for name in ARRAYS:
+            getattr(self, name)[:n] = state[name]
+        self.count = n
+        # 样式按(颜色元组, 半径)查找，JSON中的列表需要转回元组
+        self.styles = [(tuple(color), radius) for color, radius in state['styles']]
+        self.kinds = list(state['kinds'])
+
+    def draw(self, surface):
+        # 返回各子弹的绘制区域列表
+        n = self.count
+        styles = self.styles
+        circle = pygame.draw.circle
+        return [
+            circle(surface, styles[style][0], (int(x), int(y)), styles[style][1])
+            for x, y, style in zip(self.x[:n].tolist(), self.y[:n].tolist(), self.style[:n].tolist())
+        ]
+
+    def blit_sequence(self, res_manager, lag=0.0):
+        # 批量绘制用：返回(预渲染圆形, 左上角)序列，与draw逐个画圆的结果相同
+        # lag为渲染插值回退的步数（0~1），子弹匀速直线运动，可直接由速度反推
+        n = self.count
+        sprites = [res_manager.get_circle(radius, color) for color, radius in self.styles]
+        radii = np.array([radius for _, radius in self.styles] or [0], dtype=np.int64)
+        style = self.style[:n]
+        r = radii[style]
+        x, y = self.x[:n], self.y[:n]
+        if lag:
+            x = x - self.vx[:n] * lag
+            y = y - self.vy[:n] * lag
+        xs = (x.astype(np.int64) - r).tolist()
+        ys = (y.astype(np.int64) - r).tolist()
+        return [(sprites[s], (x, y)) for s, x, y in zip(style.tolist(), xs, ys)]
+
+def _first_hits(px, py, ex, ey, radius):
+    # 向量化的网格查询：只比较相邻九个格子内的子弹-敌人对
+    # 返回(每颗子弹命中的敌人下标（列表顺序最靠前者，未命中为-1）, 比较次数)
+    result = np.full(len(px), -1, dtype=np.intp)
+    if len(ex) == 0:
+        return result, 0
+    cell = float(radius)
+    stride = 1 << 20
+    ecx = np.floor(ex / cell).astype(np.int64)
+    ecy = np.floor(ey / cell).astype(np.int64)
+    order = np.argsort(ecx * stride + ecy, kind='stable')
+    keys = (ecx * stride + ecy)[order]
+
+    pcx = np.floor(px / cell).astype(np.int64)
+    pcy = np.floor(py / cell).astype(np.int64)
+    offsets = np.array([(i, j) for i in (-1, 0, 1) for j in (-1, 0, 1)], dtype=np.int64)
+    query = ((pcx[:, None] + offsets[:, 0]) * stride + (pcy[:, None] + offsets[:, 1])).ravel()
+    lo = np.searchsorted(keys, query, side='left')
+    hi = np.searchsorted(keys, query, side='right')
+    counts = hi - lo
+    total = int(counts.sum())
+    if total == 0:
+        return result, 0
+
+    # 展开所有候选对
+    proj = np.repeat(np.arange(len(query)) // len(offsets), counts)
+    starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+    enemy = order[starts + np.arange(total)]
+    d2 = (ex[enemy] - px[proj])**2 + (ey[enemy] - py[proj])**2
+    inside = d2 < radius * radius
+    if not inside.any():
+        return result, total
+
+    best = np.full(len(px), len(ex), dtype=np.intp)
+    np.minimum.at(best, proj[inside], enemy[inside])
+    found = best < len(ex)
+    result[found] = best[found]
+    return result, total
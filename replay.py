@@ -0,0 +1,200 @@
+import argparse
+import itertools
+import json
+import os
+import struct
+import sys
+import time
+
+from simulation import Simulation
+from level import load_level
+
+# 文件格式：文件头和波次配置（u32长度 + JSON）之后是一串记录，每条记录以一个字节的类型开头
+#   E 输入事件   帧(u32) 事件类型(u8) 塔类型(u8) 列(i16) 行(i16)
+#   S 状态快照   帧(u32) 长度(u32) 压缩数据（Simulation.snapshot的状态记录，不含可执行内容）
+#   X 结束       帧(u32)
+# 快照记录的字段变化（simulation.SNAPSHOT_VERSION）时也要提高VERSION
+MAGIC = b'TDRP'
+VERSION = 4
+HEADER = struct.Struct('<4sBqBH')  # 魔数, 版本, 随机种子, 是否批量敌人引擎, 模拟频率
+CONFIG = struct.Struct('<I')
+EVENT = struct.Struct('<IBBhh')
+SNAPSHOT = struct.Struct('<II')
+END = struct.Struct('<I')
+
+SELECT, PLACE, PAUSE = 1, 2, 3
+TOWER_TYPES = ("", "basic", "cannon", "archer")
+
+class ReplayRecorder:
+    # 只记录随机种子和输入事件，并定期保存模拟快照以便快速跳转
+    def __init__(self, path, seed, batched_enemies=False, tick_rate=60, waves=None, endless=False,
+                 level=None, snapshot_interval=600):
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, batched_enemies, tick_rate))
+        config = json.dumps({"waves": waves, "endless": endless, "level": level}).encode('utf-8')
+        self.file.write(CONFIG.pack(len(config)) + config)
+        self.snapshot_interval = snapshot_interval
+
+    def event(self, tick, kind, tower_type=None, col=0, row=0):
+        self.file.write(b'E' + EVENT.pack(tick, kind, TOWER_TYPES.index(tower_type or ""), col, row))
+
+    def select(self, tick, tower_type):
+        self.event(tick, SELECT, tower_type)
+
+    def place(self, tick, tower_type, col, row):
+        self.event(tick, PLACE, tower_type, col, row)
+
+    def pause(self, tick):
+        self.event(tick, PAUSE)
+
+    def after_update(self, sim):
+        # 每帧模拟结束后调用，按间隔保存快照
+        if sim.tick % self.snapshot_interval == 0:
+            data = sim.snapshot()
+            self.file.write(b'S' + SNAPSHOT.pack(sim.tick, len(data)) + data)
+
+    def close(self, sim):
+        if not self.file.closed:
+            self.file.write(b'X' + END.pack(sim.tick))
+            self.file.close()
+
+class Replay:
+    # 读取回放文件；快照只记录位置，需要时才读取和解压
+    def __init__(self, path):
+        self.path = path
+        self.events = []      # (帧, 事件类型, 塔类型, 列, 行)
+        self.snapshots = []   # (帧, 文件偏移, 长度)
+        self.end_tick = None
+        with open(path, 'rb') as f:
+            magic, version, self.seed, batched, self.tick_rate = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"不是有效的回放文件: {path}")
+            self.batched_enemies = bool(batched)
+            length, = CONFIG.unpack(f.read(CONFIG.size))
+            config = json.loads(f.read(length).decode('utf-8'))
+            self.waves, self.endless = config['waves'], config['endless']
+            self.level = config.get('level')
+            while True:
+                tag = f.read(1)
+                if not tag:
+                    break
+                if tag == b'E':
+                    tick, kind, tower, col, row = EVENT.unpack(f.read(EVENT.size))
+                    self.events.append((tick, kind, TOWER_TYPES[tower], col, row))
+                elif tag == b'S':
+                    tick, length = SNAPSHOT.unpack(f.read(SNAPSHOT.size))
+                    self.snapshots.append((tick, f.tell(), length))
+                    f.seek(length, os.SEEK_CUR)
+                elif tag == b'X':
+                    self.end_tick, = END.unpack(f.read(END.size))
+                else:
+                    raise ValueError(f"回放文件损坏: {path}")
+        if self.end_tick is None:
+            # 录制未正常结束时，以最后一个事件或快照为终点
+            ticks = [e[0] for e in self.events] + [s[0] for s in self.snapshots]
+            self.end_tick = max(ticks, default=0)
+
+    def new_simulation(self):
+        # 按录制时的配置新建模拟
+        return Simulation(seed=self.seed, batched_enemies=self.batched_enemies,
+                          tick_rate=self.tick_rate, waves=self.waves, endless=self.endless,
+                          level=load_level(self.level) if self.level else None)
+
+    def _load_snapshot(self, offset, length):
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return self.new_simulation().restore(f.read(length))
+
+    def simulation_at(self, tick):
+        # 从不晚于tick的最近快照开始，只模拟剩余的帧
+        sim = None
+        for snap_tick, offset, length in reversed(self.snapshots):
+            if snap_tick <= tick:
+                sim = self._load_snapshot(offset, length)
+                break
+        if sim is None:
+            sim = self.new_simulation()
+        self.advance(sim, tick)
+        return sim
+
+    def advance(self, sim, tick):
+        # 无显示、不限速地把sim推进到tick，途中按帧号应用输入事件
+        events = [e for e in self.events if e[0] >= sim.tick]
+        i = 0
+        while True:
+            while i < len(events) and events[i][0] == sim.tick:
+                _, kind, tower_type, col, row = events[i]
+                if kind == PLACE:
+                    sim.build_tower(tower_type, col * sim.grid_size, row * sim.grid_size)
+                i += 1
+            if sim.tick >= tick or sim.lives <= 0:
+                break
+            sim.update()
+        return sim
+
+def _fingerprint(sim):
+    # 用于比较两个模拟是否处于相同状态
+    return (sim.tick, sim.wave, sim.money, sim.lives, sim.spawned, sorted(sim.kills.items()),
+            [(e.uid, float(e.x), float(e.y), float(e.health)) for e in sim.enemies],
+            [(type(t).__name__, t.x, t.y, t.cooldown) for t in sim.towers],
+            sim.projectiles.get_state(), sim.waves.get_state() if sim.waves else None,
+            sim.rng.getstate())
+
+def check_snapshots(seed=0, snapshot_tick=1200, ticks=3000):
+    """快照往返检查：两种敌人引擎、公式波次和波次调度器的组合各运行到snapshot_tick后
+    保存并恢复快照，原模拟和恢复的模拟继续运行到ticks，状态必须完全一致；返回每种组合的结果"""
+    results = []
+    for batched, endless in itertools.product((False, True), (False, True)):
+        sim = Simulation(seed=seed, batched_enemies=batched, endless=endless)
+        for tower_type, col, row in (("basic", 3, 3), ("cannon", 8, 6), ("archer", 12, 9)):
+            sim.build_tower(tower_type, col * sim.grid_size, row * sim.grid_size)
+        while sim.tick < snapshot_tick:
+            sim.update()
+        restored = Simulation(seed=seed, batched_enemies=batched, endless=endless)
+        restored.restore(sim.snapshot())
+        same_at_snapshot = _fingerprint(restored) == _fingerprint(sim)
+        while sim.tick < ticks:
+            sim.update()
+            restored.update()
+        results.append({
+            "batched_enemies": batched,
+            "endless": endless,
+            "ok": same_at_snapshot and _fingerprint(restored) == _fingerprint(sim)
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="无显示回放")
+    parser.add_argument('replay', nargs='?', help="回放文件")
+    parser.add_argument('--seek', type=int, default=None, help="跳转到指定帧后停止")
+    parser.add_argument('--check', action='store_true',
+                        help="不读取回放文件，检查两种敌人引擎的快照保存/恢复是否一致")
+    args = parser.parse_args()
+
+    if args.check:
+        results = check_snapshots()
+        print(json.dumps(results))
+        sys.exit(0 if all(r["ok"] for r in results) else 1)
+    if args.replay is None:
+        parser.error("需要回放文件")
+    replay = Replay(args.replay)
+    target = replay.end_tick if args.seek is None else args.seek
+    start = time.perf_counter()
+    sim = replay.simulation_at(target)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "seed": replay.seed,
+        "tick_rate": replay.tick_rate,
+        "tick": sim.tick,
+        "wave": sim.wave,
+        "money": sim.money,
+        "lives": sim.lives,
+        "towers": len(sim.towers),
+        "kills": sim.kills,
+        "events": len(replay.events),
+        "snapshots": len(replay.snapshots),
+        "elapsed": elapsed
+    }, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
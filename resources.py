@@ -1,45 +1,151 @@
 import pygame
 import os
 import random
+import startup
+import hashlib
+import mmap
+import struct
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# 预处理资源的磁盘缓存目录，可通过环境变量TD_CACHE_DIR修改
+CACHE_DIR = os.environ.get('TD_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'stone_td')
+_CACHE_HEADER = struct.Struct('<4sII')  # 魔数, 宽, 高；其后为RGBA像素
+_CACHE_MAGIC = b'TDIM'
 
 class ResourceManager:
-    def __init__(self):
-        pygame.init()
+    def __init__(self, cache_size=256):
         self.images = {}
         self.sounds = {}
+        self._deferred_sounds = {}  # 尚未加载的音效路径，首次播放时才初始化音频并加载
         self.music = None
-        self.font = pygame.font.SysFont('SimHei', 24)  # 使用支持中文的字体
+        self._font = None
         
-    def load_image(self, path, name=None, scale=None):
-        try:
-            image = pygame.image.load(path).convert_alpha()
+        # 渲染缓存（LRU），保存缩放后的图片、攻击范围图层和文字，避免每帧重复创建Surface
+        self.cache_size = cache_size
+        self._render_cache = OrderedDict()
         
-            # 特殊处理背景图
-            if name == 'background':
-                # 获取当前屏幕尺寸
-                display_info = pygame.display.Info()
-                target_size = (display_info.current_w, display_info.current_h)
-            
-                # 等比缩放填充
-                img_ratio = image.get_width() / image.get_height()
-                screen_ratio = target_size[0] / target_size[1]
-            
-                if img_ratio > screen_ratio:  # 图片更宽
-                    new_height = target_size[1]
-                    new_width = int(image.get_width() * (new_height/image.get_height()))
-                else:  # 图片更高
-                    new_width = target_size[0]
-                    new_height = int(image.get_height() * (new_width/image.get_width()))
-                
-                # 居中裁剪
-                image = pygame.transform.smoothscale(image, (new_width, new_height))
-                crop_x = (new_width - target_size[0]) // 2
-                crop_y = (new_height - target_size[1]) // 2
-                image = image.subsurface((crop_x, crop_y, target_size[0], target_size[1]))
+        # 后台加载状态；version在有资源就绪时递增，用于让依赖图片的缓存失效
+        self._executor = None
+        self._pending = []
+        self.version = 0
+        
+    @property
+    def font(self):
+        # 首次使用时才加载字体，字体文件路径在启动之间缓存
+        if self._font is None:
+            self._font = startup.load_font('SimHei', 24)  # 使用支持中文的字体
+        return self._font
+        
+    def _cached(self, key, create):
+        cache = self._render_cache
+        surf = cache.get(key)
+        if surf is None:
+            surf = create()
+            cache[key] = surf
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)  # 淘汰最久未使用的
+        else:
+            cache.move_to_end(key)
+        return surf
+    
+    def get_scaled(self, name, size):
+        # 按(图片, 尺寸)缓存缩放结果；图片被替换后缓存自动失效
+        image = self.images[name]
+        key = ('scaled', name, size)
+        create = lambda: (image, pygame.transform.scale(image, size))
+        source, scaled = self._cached(key, create)
+        if source is not image:
+            del self._render_cache[key]
+            source, scaled = self._cached(key, create)
+        return scaled
+    
+    def get_range_overlay(self, radius, color):
+        # 按(射程, 颜色)缓存半透明攻击范围图层
+        def create():
+            surf = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
+            pygame.draw.circle(surf, (*color, 50), (radius, radius), radius)
+            return surf
+        return self._cached(('range', radius, tuple(color)), create)
+    
+    def render_text(self, text, color):
+        # 按(文字, 颜色)缓存文字Surface
+        return self._cached(('text', text, tuple(color)),
+                            lambda: self.font.render(text, True, color))
+    
+    def get_filled(self, size, color):
+        # 按(尺寸, 颜色)缓存纯色（可半透明）Surface
+        def create():
+            surf = pygame.Surface(size, pygame.SRCALPHA)
+            surf.fill(color)
+            return surf
+        return self._cached(('filled', size, tuple(color)), create)
+    
+    def get_circle(self, radius, color):
+        # 按(半径, 颜色)缓存预渲染的实心圆，批量绘制子弹时代替draw.circle
+        def create():
+            surf = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
+            pygame.draw.circle(surf, color, (radius, radius), radius)
+            return surf
+        return self._cached(('circle', radius, tuple(color)), create)
+    
+    def get_health_strip(self, width, height):
+        # 左半绿色、右半红色的血条图，截取其中一段即为任意血量的血条
+        def create():
+            surf = pygame.Surface((width*2, height))
+            surf.fill((0, 255, 0), (0, 0, width, height))
+            surf.fill((255, 0, 0), (width, 0, width, height))
+            return surf
+        return self._cached(('health_strip', width, height), create)
+        
+    def _target_size(self, name, scale):
+        # 背景图缩放到当前屏幕尺寸，其他图片按scale缩放
+        if name == 'background':
+            display_info = pygame.display.Info()
+            return (display_info.current_w, display_info.current_h)
+        return scale
+    
+    def _decode(self, path, name, target_size):
+        # 解码并缩放图片，结果为不依赖显示模式的32位Surface，可在后台线程中调用
+        cache_file = _cache_file(path, name, target_size)
+        if cache_file:
+            cached = _read_cached(cache_file)
+            if cached is not None:
+                return cached
+        
+        loaded = pygame.image.load(path)
+        image = pygame.Surface(loaded.get_size(), pygame.SRCALPHA, 32)
+        image.blit(loaded, (0, 0))
         
-            elif scale:  # 其他图片的正常缩放
-                image = pygame.transform.smoothscale(image, scale)
+        # 特殊处理背景图
+        if name == 'background':
+            # 等比缩放填充
+            img_ratio = image.get_width() / image.get_height()
+            screen_ratio = target_size[0] / target_size[1]
+        
+            if img_ratio > screen_ratio:  # 图片更宽
+                new_height = target_size[1]
+                new_width = int(image.get_width() * (new_height/image.get_height()))
+            else:  # 图片更高
+                new_width = target_size[0]
+                new_height = int(image.get_height() * (new_width/image.get_width()))
             
+            # 居中裁剪
+            image = pygame.transform.smoothscale(image, (new_width, new_height))
+            crop_x = (new_width - target_size[0]) // 2
+            crop_y = (new_height - target_size[1]) // 2
+            image = image.subsurface((crop_x, crop_y, target_size[0], target_size[1])).copy()
+    
+        elif target_size:  # 其他图片的正常缩放
+            image = pygame.transform.smoothscale(image, target_size)
+        
+        if cache_file:
+            _write_cached(cache_file, image)
+        return image
+        
+    def load_image(self, path, name=None, scale=None):
+        try:
+            image = self._decode(path, name, self._target_size(name, scale)).convert_alpha()
             key = name if name else os.path.basename(path)
             self.images[key] = image
             return image
@@ -53,6 +159,56 @@ class ResourceManager:
                 return surf
             return self._create_placeholder(scale if scale else (50, 50))
     
+    def _submit(self, func, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='assets')
+        return self._executor.submit(func, *args)
+    
+    def load_image_async(self, path, name=None, scale=None):
+        # 后台线程加载图片，加载完成前images中放置占位图，由poll()替换
+        key = name if name else os.path.basename(path)
+        target_size = self._target_size(name, scale)
+        self.images[key] = self._create_placeholder(target_size or (50, 50))
+        future = self._submit(self._decode, path, name, target_size)
+        self._pending.append((future, 'image', key, path))
+    
+    def load_music_async(self, path):
+        self._pending.append((self._submit(self.load_music, path), 'music', None, path))
+    
+    def poll(self):
+        # 在主线程中收取已完成的后台加载结果，返回本次就绪的资源数
+        if not self._pending:
+            return 0
+        ready = 0
+        pending = []
+        for job in self._pending:
+            future, kind, key, path = job
+            if not future.done():
+                pending.append(job)
+                continue
+            ready += 1
+            try:
+                result = future.result()
+            except Exception as e:
+                if kind == 'image':
+                    print(f"图片加载失败 {path}: {e}")
+                    self.images.pop(key, None)  # 与同步加载失败时一致，不保留占位图
+                else:
+                    print(f"音乐加载失败 {path}: {e}")
+                continue
+            if kind == 'image':
+                self.images[key] = result.convert_alpha()
+        self._pending = pending
+        if ready:
+            self.version += 1
+        return ready
+    
+    def wait(self):
+        # 阻塞直到所有后台加载完成
+        for future, *_ in self._pending:
+            future.exception()
+        self.poll()
+    
     def _create_placeholder(self, size):
         surf = pygame.Surface(size, pygame.SRCALPHA)
         color = (random.randint(50,200), random.randint(50,200), random.randint(50,200))
@@ -60,6 +216,8 @@ class ResourceManager:
         return surf
     
     def load_music(self, path):
+        if not startup.init_mixer():
+            return False
         try:
             pygame.mixer.music.load(path)
             self.music = path
@@ -70,7 +228,31 @@ class ResourceManager:
             print(f"音乐加载失败 {path}: {e}")
             return False
     
+    def defer_sound(self, path, name=None):
+        # 登记音效，不初始化音频设备
+        key = name if name else os.path.basename(path)
+        self._deferred_sounds[key] = path
+    
+    def get_sound(self, name):
+        # 取得音效；第一次使用时才初始化音频并加载该音效，不可用时返回None
+        sound = self.sounds.get(name)
+        if sound is None:
+            path = self._deferred_sounds.pop(name, None)
+            if path is None:
+                return None
+            sound = self.load_sound(path, name)
+        return sound
+    
+    def play_sound(self, name):
+        # 直接播放音效；游戏内的音效应通过AudioManager统一调度
+        sound = self.get_sound(name)
+        if sound is not None:
+            sound.play()
+        return sound
+    
     def load_sound(self, path, name=None):
+        if not startup.init_mixer():
+            return None
         try:
             sound = pygame.mixer.Sound(path)
             key = name if name else os.path.basename(path)
@@ -78,4 +260,39 @@ class ResourceManager:
             return sound
         except Exception as e:
             print(f"音效加载失败 {path}: {e}")
-            return None
\ No newline at end of file
+            return None
+
+def _cache_file(path, name, target_size):
+    # 缓存文件名由源文件路径、修改时间和目标尺寸决定，源文件不存在时返回None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{name == 'background'}|{target_size}"
+    return os.path.join(CACHE_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.rgba')
+
+def _read_cached(cache_file):
+    # 通过内存映射读取缓存的像素数据，不存在或损坏时返回None
+    try:
+        with open(cache_file, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(data) < _CACHE_HEADER.size:
+        return None
+    magic, width, height = _CACHE_HEADER.unpack_from(data)
+    if magic != _CACHE_MAGIC or len(data) != _CACHE_HEADER.size + width * height * 4:
+        return None
+    return pygame.image.frombuffer(memoryview(data)[_CACHE_HEADER.size:], (width, height), 'RGBA')
+
+def _write_cached(cache_file, image):
+    # 先写临时文件再替换，避免并发读到半个文件；写入失败（如只读目录）时忽略
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(_CACHE_HEADER.pack(_CACHE_MAGIC, *image.get_size()))
+            f.write(pygame.image.tobytes(image, 'RGBA'))
+        os.replace(tmp, cache_file)
+    except OSError:
+        pass
\ No newline at end of file
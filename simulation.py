@@ -0,0 +1,289 @@
+import random
+import time
+import json
+import zlib
+import numpy as np
+import startup  # 先于path等模块导入pygame
+from path import Path
+from grid import BuildGrid
+from tower import BasicTower, CannonTower, ArcherTower
+from enemy import Enemy, EnemyPool
+from spatial import SpatialHash
+from projectile import ProjectileManager
+from waves import WaveScheduler
+
+KILL_REWARD = 20  # 每击杀一个敌人获得的金钱
+BASE_TICK_RATE = 60  # 速度、冷却等数值以该频率下的每帧为单位
+# 快照记录的格式版本，snapshot中保存的字段有任何变化都要加一（同时提高replay.VERSION）
+SNAPSHOT_VERSION = 1
+ENEMY_FIELDS = ('uid', 'distance', 'x', 'y', 'speed', 'health', 'max_health')
+TOWER_FIELDS = ('x', 'y', 'cooldown', 'range', 'damage', 'cooldown_max', 'targeting')
+
+TOWER_CLASSES = {
+    "basic": BasicTower,
+    "cannon": CannonTower,
+    "archer": ArcherTower
+}
+
+class Simulation:
+    # 游戏模拟状态（路径、防御塔、敌人、波次、金钱、生命），不依赖显示和输入
+    def __init__(self, seed=None, batched_enemies=False, screen_size=(800, 600), params=None,
+                 tick_rate=BASE_TICK_RATE, waves=None, endless=False, level=None):
+        # level为level.Level（编译后的关卡），提供路径、屏幕尺寸和预计算的占用表
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.screen_size = level.screen_size if level else screen_size
+        # 模拟频率（每秒tick数）；dt为每个tick相当于基准频率下的帧数
+        self.tick_rate = tick_rate
+        self.dt = BASE_TICK_RATE / tick_rate
+
+        self.path = level.path if level else Path()
+        self.towers = []
+        self.enemies = []
+        self.enemy_pool = EnemyPool()  # 回收移除的敌人，供后续波次复用
+        self.enemy_index = SpatialHash(cell_size=64)  # 敌人位置空间索引
+        # 可选的NumPy批量敌人引擎，self.enemies中保存的是其视图
+        self.enemy_store = None
+        if batched_enemies:
+            from enemy_batch import EnemyStore
+            self.enemy_store = EnemyStore(self.path)
+        self.projectiles = ProjectileManager()  # 全局子弹池
+        self.kills = {}  # 各类防御塔的击杀数
+        self.spawned = 0  # 已生成的敌人总数，用于分配敌人编号
+        self.tick = 0
+        self.wave = 1
+        self.money = 1000
+        self.lives = 10
+        self.tower_costs = {
+            "basic": 100,
+            "cannon": 200,
+            "archer": 150
+        }
+        self.tower_stats = {}  # 按塔类型覆盖damage/range/cooldown_max等属性
+        # 每波敌人数 = min(wave_base + 波次 * wave_growth, wave_cap)
+        self.wave_base = 5
+        self.wave_growth = 2
+        self.wave_cap = 20
+        if params:
+            self.apply_params(params)
+        # 波次文件（见waves.py）或无尽模式时由调度器分散生成敌人，否则使用上面的公式
+        self.waves = None
+        if waves is not None or endless:
+            self.waves = WaveScheduler(waves or {}, tick_rate, endless)
+        if level:
+            self.grid_size = level.grid_size
+            self.grid = level.new_grid()
+        else:
+            self.grid_size = 40
+            self.grid = BuildGrid(self.path, screen_size, self.grid_size)  # 建造占用表
+        self.buildable_grid = self.grid.buildable_rects()
+
+    def snapshot(self):
+        """把会随模拟变化的状态逐项写成JSON记录并压缩，可用restore恢复
+        路径、占用表、波次文件等由构造参数决定的部分不保存，恢复时由新建的Simulation提供"""
+        types = {cls: name for name, cls in TOWER_CLASSES.items()}
+        if self.enemy_store:
+            store, n = self.enemy_store, len(self.enemies)
+            enemies = {name: getattr(store, name)[:n].tolist() for name in ENEMY_FIELDS}
+        else:
+            enemies = {name: [getattr(e, name) for e in self.enemies] for name in ENEMY_FIELDS}
+        enemies['type'] = [e.type for e in self.enemies]
+        state = {
+            "version": SNAPSHOT_VERSION,
+            "tick": self.tick,
+            "wave": self.wave,
+            "money": self.money,
+            "lives": self.lives,
+            "spawned": self.spawned,
+            "kills": self.kills,
+            "rng": self.rng.getstate(),
+            "tower_costs": self.tower_costs,
+            "tower_stats": self.tower_stats,
+            "wave_formula": [self.wave_base, self.wave_growth, self.wave_cap],
+            "towers": [[types[type(t)]] + [getattr(t, name) for name in TOWER_FIELDS]
+                       for t in self.towers],
+            "enemies": enemies,
+            "projectiles": self.projectiles.get_state(),
+            "waves": self.waves.get_state() if self.waves else None
+        }
+        return zlib.compress(json.dumps(state, separators=(',', ':')).encode('utf-8'))
+
+    def restore(self, data):
+        """把snapshot保存的状态载入到刚创建、尚未运行的Simulation中
+        该Simulation的构造参数（关卡、敌人引擎、模拟频率、波次配置）必须与保存时相同"""
+        state = json.loads(zlib.decompress(data).decode('utf-8'))
+        if state.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"不支持的快照版本: {state.get('version')}")
+        self.tick = state["tick"]
+        self.wave = state["wave"]
+        self.money = state["money"]
+        self.lives = state["lives"]
+        self.spawned = state["spawned"]
+        self.kills = state["kills"]
+        version, internal, gauss = state["rng"]
+        self.rng.setstate((version, tuple(internal), gauss))
+        self.tower_costs = state["tower_costs"]
+        self.tower_stats = state["tower_stats"]
+        self.wave_base, self.wave_growth, self.wave_cap = state["wave_formula"]
+
+        for tower_type, *values in state["towers"]:
+            tower = TOWER_CLASSES[tower_type](0, 0)
+            for name, value in zip(TOWER_FIELDS, values):
+                setattr(tower, name, value)
+            tower.rect.center = (tower.x, tower.y)
+            self.towers.append(tower)
+            self.grid.place(*self.grid.cell_at(tower.x, tower.y), tower)
+
+        # 恢复的敌人不从self.rng抽取速度，之后再覆盖各字段
+        enemies = state["enemies"]
+        if self.enemy_store:
+            store = self.enemy_store
+            for enemy_type in enemies['type']:
+                store.spawn(enemy_type)
+            n = store.count
+            for name in ENEMY_FIELDS:
+                getattr(store, name)[:n] = enemies[name]
+            self.enemies = store.views
+        else:
+            for i, enemy_type in enumerate(enemies['type']):
+                enemy = Enemy(self.path, enemy_type)
+                for name in ENEMY_FIELDS:
+                    setattr(enemy, name, enemies[name][i])
+                self.enemies.append(enemy)
+
+        self.projectiles.set_state(state["projectiles"])
+        if self.waves:
+            self.waves.set_state(state["waves"])
+        return self
+
+    def apply_params(self, params):
+        # 平衡参数：money、lives、tower_costs、tower_stats、wave_base/wave_growth/wave_cap
+        for key, value in params.items():
+            if key == 'tower_costs':
+                self.tower_costs.update(value)
+            elif key == 'tower_stats':
+                for tower_type, stats in value.items():
+                    self.tower_stats.setdefault(tower_type, {}).update(stats)
+            elif key in ('money', 'lives', 'wave_base', 'wave_growth', 'wave_cap'):
+                setattr(self, key, value)
+            else:
+                raise ValueError(f"未知的平衡参数: {key}")
+
+    def can_build(self, grid_x, grid_y):
+        cell = self.grid.cell_at(grid_x, grid_y)
+        return cell is not None and self.grid.can_build(*cell)
+
+    def build_tower(self, tower_type, grid_x, grid_y):
+        # 在网格左上角(grid_x, grid_y)处建造防御塔，失败返回None
+        if not self.can_build(grid_x, grid_y):
+            return None
+        cost = self.tower_costs[tower_type]
+        if self.money < cost:
+            return None
+
+        col, row = self.grid.cell_at(grid_x, grid_y)
+        center_x = col * self.grid_size + self.grid_size // 2
+        center_y = row * self.grid_size + self.grid_size // 2
+        tower = TOWER_CLASSES[tower_type](center_x, center_y)
+        for attr, value in self.tower_stats.get(tower_type, {}).items():
+            setattr(tower, attr, value)
+        # 鼠标悬停时显示攻击范围
+        tower.show_range = False
+        self.towers.append(tower)
+        self.grid.place(col, row, tower)
+        self.money -= cost
+        return tower
+
+    def update(self, tower_timings=None):
+        # 推进一帧模拟，返回本帧开火的防御塔数量
+        # tower_timings为字典时按防御塔类型累计攻击耗时（性能分析用）
+        self.tick += 1
+
+        # 波次生成
+        if self.waves:
+            self.waves.update(self)
+        elif len(self.enemies) == 0:
+            self.spawn_wave()
+
+        self.update_enemies()
+        self.rebuild_index()
+        fired = self.update_towers(tower_timings)
+        self.update_projectiles()
+        return fired
+
+    def update_enemies(self):
+        # 敌人更新
+        if self.enemy_store:
+            self.enemies = self.enemy_store.step(self)
+        else:
+            alive = []
+            for enemy in self.enemies:
+                if enemy.update(self):
+                    alive.append(enemy)
+                else:
+                    self.enemy_pool.release(enemy)
+            self.enemies = alive
+
+    def rebuild_index(self):
+        # 每帧重建一次空间索引，供塔的索敌查询使用
+        if self.enemy_store:
+            self.enemy_index.rebuild(self.enemies, *self.enemy_store.positions())
+        else:
+            self.enemy_index.rebuild(self.enemies)
+
+    def update_towers(self, timings=None):
+        # 防御塔攻击，返回开火的防御塔数量
+        fired = 0
+        if timings is not None:
+            clock = time.perf_counter
+            for tower in self.towers:
+                start = clock()
+                if tower.attack(self.enemies, self.projectiles, self.enemy_index, self.dt):
+                    fired += 1
+                kind = type(tower).__name__
+                timings[kind] = timings.get(kind, 0.0) + clock() - start
+            return fired
+        for tower in self.towers:
+            if tower.attack(self.enemies, self.projectiles, self.enemy_index, self.dt):
+                fired += 1
+        return fired
+
+    def update_projectiles(self):
+        # 批量更新子弹并结算命中，击杀事件一次性返回
+        n = len(self.enemies)
+        if self.enemy_store:
+            store = self.enemy_store
+            xs, ys, health = store.x[:n], store.y[:n], store.health[:n]
+        else:
+            xs = np.fromiter((e.x for e in self.enemies), np.float64, n)
+            ys = np.fromiter((e.y for e in self.enemies), np.float64, n)
+            health = np.fromiter((e.health for e in self.enemies), np.float64, n)
+        hit, killed, killers = self.projectiles.update(xs, ys, health)
+        if not self.enemy_store:
+            for i in hit.tolist():
+                self.enemies[i].health = health[i].item()
+        self.money += KILL_REWARD * len(killed)
+        for kind in killers:
+            self.kills[kind] = self.kills.get(kind, 0) + 1
+
+    def wave_cleared(self):
+        # 当前波次的敌人已全部生成并被消灭（或到达终点）
+        return not self.enemies and not (self.waves and self.waves.pending())
+
+    def spawn_enemy(self, enemy_type):
+        if self.enemy_store:
+            enemy = self.enemy_store.spawn(enemy_type, self.rng)
+            self.enemies = self.enemy_store.views
+        else:
+            enemy = self.enemy_pool.acquire(self.path, enemy_type, self.rng)
+            self.enemies.append(enemy)
+        enemy.uid = self.spawned
+        self.spawned += 1
+        return enemy
+
+    def spawn_wave(self):
+        enemy_count = min(self.wave_base + self.wave * self.wave_growth, self.wave_cap)
+        for _ in range(enemy_count):
+            enemy_type = 'enemy1' if self.rng.random() < 0.7 else 'enemy2'
+            self.spawn_enemy(enemy_type)
+        self.wave += 1
@@ -0,0 +1,59 @@
+class SpatialHash:
+    # 均匀网格空间索引，每帧由Game.update重建一次
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.checks = 0  # 累计的距离比较次数，供性能分析读取
+
+    def rebuild(self, enemies, xs=None, ys=None):
+        # xs/ys可直接传入坐标序列（如批量引擎的数组），省去逐个读取属性
+        self.cells = {}
+        size = self.cell_size
+        cells = self.cells
+        if xs is None:
+            xs = [enemy.x for enemy in enemies]
+            ys = [enemy.y for enemy in enemies]
+        # 记录敌人在列表中的序号，查询时按序号取最早的敌人，与逐个扫描的结果一致
+        for order, (enemy, x, y) in enumerate(zip(enemies, xs, ys)):
+            key = (int(x // size), int(y // size))
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [(order, x, y, enemy)]
+            else:
+                bucket.append((order, x, y, enemy))
+
+    def _candidates(self, x, y, radius):
+        size = self.cell_size
+        cells = self.cells
+        min_cx, max_cx = int((x - radius) // size), int((x + radius) // size)
+        min_cy, max_cy = int((y - radius) // size), int((y + radius) // size)
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    self.checks += len(bucket)
+                    yield from bucket
+
+    def query_radius(self, x, y, radius):
+        # 返回半径内的所有敌人（按列表顺序），使用距离平方比较
+        r2 = radius * radius
+        found = [
+            (order, enemy) for order, ex, ey, enemy in self._candidates(x, y, radius)
+            if (ex - x)**2 + (ey - y)**2 <= r2
+        ]
+        found.sort(key=lambda item: item[0])
+        return [enemy for _, enemy in found]
+
+    def query_best(self, x, y, radius, key):
+        # 返回半径内key值最大的敌人，相同时取列表顺序靠前者，没有则返回None
+        r2 = radius * radius
+        best_order = None
+        best_key = None
+        best = None
+        for order, ex, ey, enemy in self._candidates(x, y, radius):
+            if (ex - x)**2 + (ey - y)**2 > r2:
+                continue
+            value = key(enemy)
+            if best is None or value > best_key or (value == best_key and order < best_order):
+                best_order, best_key, best = order, value, enemy
+        return best
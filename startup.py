@@ -0,0 +1,100 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+_START = time.perf_counter()
+_timings = []  # (阶段, 耗时ms)
+report_enabled = False
+
+@contextmanager
+def timed(label):
+    # 记录一个启动阶段的耗时
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _timings.append((label, (time.perf_counter() - start) * 1000))
+
+# 不输出pygame的欢迎信息：游戏和经由simulation导入的无显示工具（headless、batch、replay等）
+# 都先导入本模块，这些工具的标准输出保持为纯JSON；直接导入path/grid的模块（如level.py）不在此列
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+with timed("import pygame"):
+    import pygame
+
+def init_display():
+    # 各子系统只在首次需要时初始化一次
+    if not pygame.display.get_init():
+        with timed("display init"):
+            pygame.display.init()
+
+def init_font():
+    if not pygame.font.get_init():
+        with timed("font init"):
+            pygame.font.init()
+
+_mixer_failed = False
+
+def init_mixer():
+    # 音频延迟到第一次播放时才初始化；没有声卡时返回False且不再重试
+    global _mixer_failed
+    if pygame.mixer.get_init():
+        return True
+    if _mixer_failed:
+        return False
+    with timed("mixer init"):
+        try:
+            pygame.mixer.init()
+        except pygame.error as e:
+            print(f"音频初始化失败: {e}")
+            _mixer_failed = True
+            return False
+    return True
+
+def _font_cache_path():
+    from resources import CACHE_DIR
+    return os.path.join(CACHE_DIR, 'fonts.json')
+
+def load_font(name, size):
+    """按名称加载系统字体，解析出的字体文件路径缓存到磁盘，
+    下次启动无需扫描系统字体列表；找不到时使用pygame默认字体"""
+    init_font()
+    cache_path = _font_cache_path()
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    path = cache.get(name)
+    if path is not None and (path == '' or os.path.exists(path)):
+        with timed(f"font {name} (cached)"):
+            return pygame.font.Font(path or None, size)
+
+    with timed(f"font {name} (scan)"):
+        path = pygame.font.match_font(name) or ''
+        font = pygame.font.Font(path or None, size)
+    cache[name] = path
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass  # 缓存写入失败不影响启动
+    return font
+
+def finish():
+    # 首帧绘制完成时调用，按需输出启动耗时报告
+    _timings.append(("total to first frame", (time.perf_counter() - _START) * 1000))
+    if report_enabled:
+        print(format_report(), file=sys.stderr)
+
+def format_report():
+    lines = ["启动耗时:"]
+    for label, ms in _timings:
+        lines.append(f"  {label:<28}{ms:8.1f} ms")
+    return "\n".join(lines)
+
+def timings():
+    return list(_timings)
@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+class StateServer:
+    """在后台线程运行的asyncio服务器，通过本机TCP连接推送游戏状态
+    每行一条JSON消息，只包含相对该客户端上一条消息的变化；游戏线程的publish从不等待网络，
+    客户端来不及接收时只保留最新状态，中间的状态被丢弃而不是排队"""
+    def __init__(self, host='127.0.0.1', port=0, rate=20):
+        self.host = host
+        self.port = port
+        self.interval = 1.0 / rate
+        self.towers = []     # 全部防御塔（只增不减），由服务器线程维护
+        self.latest = None   # 最新一次发布的状态
+        self.clients = set()
+        self._last_publish = None
+        self._last_tick = None
+        self._towers_published = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._error = None  # 服务器线程中启动监听失败的异常
+
+    def start(self):
+        # 启动后台线程，返回实际监听的端口（port为0时由系统分配）
+        # 无法监听（如端口已被占用）时抛出服务器线程中的OSError
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name='state-stream',
+                                        daemon=True)
+        self._thread.start()
+        ready.wait()
+        if self._error is not None:
+            self._thread.join()
+            self._loop = None  # publish和close变为空操作
+            raise self._error
+        return self.port
+
+    def _run(self, ready):
+        loop = self._loop
+        asyncio.set_event_loop(loop)
+        try:
+            self._server = loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port))
+            self.port = self._server.sockets[0].getsockname()[1]
+        except Exception as e:
+            # 交给start在游戏线程中抛出，否则start会一直等待
+            self._error = e
+            loop.close()
+            return
+        finally:
+            ready.set()
+        loop.run_forever()
+        loop.close()
+
+    def publish(self, sim, now=None):
+        """游戏线程每帧调用；按rate限频，只复制当前状态并交给服务器线程，返回是否发布"""
+        if self._loop is None:
+            return False
+        now = time.perf_counter() if now is None else now
+        if sim.tick == self._last_tick or \
+                (self._last_publish is not None and now - self._last_publish < self.interval):
+            return False
+        self._last_publish = now
+        self._last_tick = sim.tick
+        new_towers = [[type(t).__name__, t.x, t.y] for t in sim.towers[self._towers_published:]]
+        self._towers_published = len(sim.towers)
+        store = sim.enemy_store
+        if store:
+            n = len(sim.enemies)
+            enemies = list(zip(store.uid[:n].tolist(), store.x[:n].tolist(), store.y[:n].tolist(),
+                               store.health[:n].tolist()))
+        else:
+            enemies = [(e.uid, float(e.x), float(e.y), float(e.health)) for e in sim.enemies]
+        snapshot = {
+            "tick": sim.tick,
+            "wave": sim.wave,
+            "money": sim.money,
+            "lives": sim.lives,
+            "enemies": enemies
+        }
+        self._loop.call_soon_threadsafe(self._on_snapshot, snapshot, new_towers)
+        return True
+
+    def _on_snapshot(self, snapshot, new_towers):
+        # 服务器线程：更新最新状态并唤醒各客户端的发送任务
+        self.towers.extend(new_towers)
+        self.latest = snapshot
+        for client in self.clients:
+            if client.ready.is_set():
+                client.dropped += 1  # 上一个状态还没来得及发送，被新状态取代
+            client.ready.set()
+
+    async def _handle(self, reader, writer):
+        client = _Client()
+        client.task = asyncio.current_task()
+        self.clients.add(client)
+        if self.latest is not None:
+            client.ready.set()
+        try:
+            while True:
+                await client.ready.wait()
+                client.ready.clear()
+                writer.write(client.encode(self.latest, self.towers))
+                await writer.drain()  # 只阻塞这个客户端自己的发送任务
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+
+    def stats(self):
+        return {
+            "clients": len(self.clients),
+            "sent": sum(c.sent for c in self.clients),
+            "dropped": sum(c.dropped for c in self.clients)
+        }
+
+    def close(self):
+        if self._loop is None:
+            return
+        loop = self._loop
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(), loop)
+        try:
+            future.result(timeout=2)
+        except TimeoutError:
+            # 关闭失败不应影响游戏退出，服务器线程是守护线程，随进程结束
+            print("状态流关闭超时")
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(timeout=2)
+            self._loop = None
+
+    async def _shutdown(self):
+        # 先结束各客户端的发送任务（其中会关闭连接），再关闭监听；
+        # Python 3.12起wait_closed会等待所有连接关闭，顺序相反会一直等待
+        tasks = [client.task for client in self.clients]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._server.close()
+        await self._server.wait_closed()
+
+class _Client:
+    # 每个客户端各自记录上次发送的内容，差量相对于它计算，因此丢弃中间状态不影响正确性
+    def __init__(self):
+        self.ready = asyncio.Event()
+        self.task = None    # 服务器中负责该客户端的任务
+        self.enemies = {}   # 编号 -> (x, y, 血量)
+        self.towers = 0
+        self.scalars = {}
+        self.sent = 0
+        self.dropped = 0
+
+    def encode(self, snapshot, towers):
+        msg = {"tick": snapshot["tick"]}
+        if self.sent == 0:
+            msg["full"] = True
+        for key in ("wave", "money", "lives"):
+            if self.scalars.get(key) != snapshot[key]:
+                msg[key] = self.scalars[key] = snapshot[key]
+
+        # 坐标和血量保留一位小数，变化小于此精度的敌人不发送
+        current = {}
+        changed = []
+        for uid, x, y, health in snapshot["enemies"]:
+            state = (round(x, 1), round(y, 1), round(health, 1))
+            current[uid] = state
+            if self.enemies.get(uid) != state:
+                changed.append([uid, *state])
+        removed = [uid for uid in self.enemies if uid not in current]
+        self.enemies = current
+        if changed:
+            msg["enemies"] = changed
+        if removed:
+            msg["removed"] = removed
+        if len(towers) > self.towers:
+            msg["towers"] = towers[self.towers:]
+            self.towers = len(towers)
+        self.sent += 1
+        return (json.dumps(msg, separators=(',', ':')) + '\n').encode('utf-8')
+
+class StateMirror:
+    # 客户端：依次应用差量消息，还原完整的游戏状态
+    def __init__(self):
+        self.tick = None
+        self.wave = self.money = self.lives = None
+        self.enemies = {}
+        self.towers = []
+
+    def apply(self, msg):
+        self.tick = msg["tick"]
+        for key in ("wave", "money", "lives"):
+            if key in msg:
+                setattr(self, key, msg[key])
+        for uid, x, y, health in msg.get("enemies", ()):
+            self.enemies[uid] = (x, y, health)
+        for uid in msg.get("removed", ()):
+            del self.enemies[uid]
+        self.towers.extend(msg.get("towers", ()))
+
+async def watch(host, port, count=None, callback=None):
+    """连接服务器并逐条应用消息，收到count条后返回StateMirror；callback(mirror, msg)每条调用一次"""
+    reader, writer = await asyncio.open_connection(host, port)
+    mirror = StateMirror()
+    received = 0
+    try:
+        while count is None or received < count:
+            line = await reader.readline()
+            if not line:
+                break
+            msg = json.loads(line)
+            mirror.apply(msg)
+            received += 1
+            if callback:
+                callback(mirror, msg)
+    finally:
+        writer.close()
+    return mirror
+
+def main():
+    parser = argparse.ArgumentParser(description="本地状态流客户端：连接游戏并打印每次更新")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--count', type=int, default=None, help="收到指定条数后退出")
+    args = parser.parse_args()
+
+    def show(mirror, msg):
+        print(f"tick {mirror.tick} 波次 {mirror.wave} 金钱 {mirror.money} 生命 {mirror.lives} "
+              f"敌人 {len(mirror.enemies)} 防御塔 {len(mirror.towers)} "
+              f"({len(msg.get('enemies', ()))}变化/{len(msg.get('removed', ()))}移除)", flush=True)
+
+    try:
+        asyncio.run(watch(args.host, args.port, args.count, show))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
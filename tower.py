@@ -1,38 +1,17 @@
 import pygame
-import math
 
-class Projectile:
-    def __init__(self, start_x, start_y, target_x, target_y, speed, damage, color, radius):
-        self.x = start_x
-        self.y = start_y
-        self.target_x = target_x
-        self.target_y = target_y
-        self.speed = speed
-        self.damage = damage
-        self.color = color
-        self.radius = radius
-        self.active = True
-        
-        # 计算方向向量
-        dx = target_x - start_x
-        dy = target_y - start_y
-        dist = math.sqrt(dx**2 + dy**2)
-        self.vx = dx / dist * speed
-        self.vy = dy / dist * speed
-        
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        
-        # 检查是否到达目标位置
-        dist = math.sqrt((self.target_x - self.x)**2 + (self.target_y - self.y)**2)
-        if dist < 5:
-            self.active = False
-            
-    def draw(self, surface):
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.radius)
+# 索敌策略：在射程内选择该值最大的敌人
+TARGETING = {
+    "first": lambda enemy: enemy.distance,      # 最接近终点
+    "last": lambda enemy: -enemy.distance,      # 最靠近起点
+    "strongest": lambda enemy: enemy.health     # 血量最高
+}
 
 class Tower:
+    # 子类只修改已有字段，因此都声明空的__slots__，不带实例字典
+    __slots__ = ('x', 'y', 'image_key', 'range', 'damage', 'cooldown', 'cooldown_max',
+                 'width', 'height', 'rect', 'color', 'show_range', 'targeting')
+
     def __init__(self, x, y, image_key):
         self.x = x
         self.y = y
@@ -46,46 +25,33 @@ class Tower:
         self.rect = pygame.Rect(x - self.width//2, y - self.height//2, 
                                self.width, self.height)
         self.color = (0, 100, 200)  # 默认蓝色
-        self.projectiles = []
         self.show_range = False  # 默认不显示攻击范围
+        self.targeting = "first"  # 索敌策略，见TARGETING
         
-    def attack(self, enemies):
+    def attack(self, enemies, projectiles, index=None, dt=1.0):
+        # dt为每个模拟tick相当于60Hz下的帧数，子弹速度和冷却按此换算
         if self.cooldown <= 0:
-            for enemy in enemies[:]:
-                dist = math.sqrt((self.x-enemy.x)**2 + (self.y-enemy.y)**2)
-                if dist <= self.range:
-                    # 创建子弹
-                    self.projectiles.append(
-                        Projectile(self.x, self.y, enemy.x, enemy.y, 
-                                 self.get_projectile_speed(), self.damage,
-                                 self.get_projectile_color(), self.get_projectile_radius())
-                    )
-                    
-                    self.cooldown = self.cooldown_max
-                    return enemy  # 返回目标敌人，但不立即造成伤害
+            key = TARGETING[self.targeting]
+            if index is not None:
+                # 通过空间索引查询射程内按策略最优的敌人
+                enemy = index.query_best(self.x, self.y, self.range, key)
+            else:
+                r2 = self.range * self.range
+                in_range = [e for e in enemies if (self.x-e.x)**2 + (self.y-e.y)**2 <= r2]
+                enemy = max(in_range, key=key) if in_range else None
+            if enemy:
+                # 创建子弹，交由全局子弹管理器统一更新
+                projectiles.spawn(self.x, self.y, enemy.x, enemy.y,
+                                  self.get_projectile_speed() * dt, self.damage,
+                                  self.get_projectile_color(), self.get_projectile_radius(),
+                                  type(self).__name__)
+                
+                self.cooldown = self.cooldown_max
+                return enemy  # 返回目标敌人，但不立即造成伤害
         else:
-            self.cooldown -= 1
+            self.cooldown -= dt
         return None
     
-    def update_projectiles(self, enemies):
-        killed_enemy = None
-        for proj in self.projectiles[:]:
-            if proj.active:
-                proj.update()
-                
-                # 检查是否击中敌人
-                for enemy in enemies:
-                    dist = math.sqrt((proj.x-enemy.x)**2 + (proj.y-enemy.y)**2)
-                    if dist < 20:  # 击中判定距离
-                        killed = enemy.take_damage(proj.damage)
-                        if killed:
-                            killed_enemy = killed
-                        proj.active = False
-                        break
-            else:
-                self.projectiles.remove(proj)
-        return killed_enemy
-    
     def get_projectile_speed(self):
         return 5
     
@@ -96,28 +62,38 @@ class Tower:
         return 5
         
     def draw(self, surface, res_manager):
+        self.draw_sprite(surface, res_manager)
+        self.draw_range(surface, res_manager)
+    
+    def draw_sprite(self, surface, res_manager):
         """新增图片缩放和定位逻辑"""
+        sprite = self.sprite_blit(res_manager)
+        return surface.blit(*sprite) if sprite else None
+    
+    def sprite_blit(self, res_manager):
+        # 返回(图片, 位置)，供Surface.blits批量绘制；图片未加载时返回None
         if self.image_key in res_manager.images:
-            img = res_manager.images[self.image_key]
-            # 等比例缩放至网格尺寸
-            scaled_img = pygame.transform.scale(
-                img, 
+            # 等比例缩放至网格尺寸（缩放结果由资源管理器缓存）
+            scaled_img = res_manager.get_scaled(
+                self.image_key, 
                 (int(self.width * 0.9), int(self.height * 0.9))  # 保留10%边距
             )
-            rect = scaled_img.get_rect(center=(self.x, self.y))
-            surface.blit(scaled_img, rect)
-        
-        # 绘制攻击范围（仅在show_range为True时显示）
+            return scaled_img, scaled_img.get_rect(center=(self.x, self.y))
+        return None
+    
+    def draw_range(self, surface, res_manager):
+        # 绘制攻击范围（仅在show_range为True时显示），返回绘制区域
         if self.show_range:
-            range_surface = pygame.Surface((self.range*2, self.range*2), pygame.SRCALPHA)
-            pygame.draw.circle(range_surface, (*self.color, 50), (self.range, self.range), self.range)
-            surface.blit(range_surface, (self.x-self.range, self.y-self.range))
-        
-        # 绘制子弹
-        for proj in self.projectiles:
-            proj.draw(surface)
+            return surface.blit(*self.range_blit(res_manager))
+        return None
+    
+    def range_blit(self, res_manager):
+        range_surface = res_manager.get_range_overlay(self.range, self.color)
+        return range_surface, (self.x-self.range, self.y-self.range)
 
 class BasicTower(Tower):
+    __slots__ = ()
+
     def __init__(self, x, y):
         super().__init__(x, y, "basic_tower")
         self.color = (0, 100, 200)  # 蓝色
@@ -131,6 +107,8 @@ class BasicTower(Tower):
         return 4
 
 class CannonTower(Tower):
+    __slots__ = ()
+
     def __init__(self, x, y):
         super().__init__(x, y, "cannon_tower")
         self.color = (200, 100, 50)  # 橙色
@@ -147,6 +125,8 @@ class CannonTower(Tower):
         return 6
 
 class ArcherTower(Tower):
+    __slots__ = ()
+
     def __init__(self, x, y):
         super().__init__(x, y, "archer_tower")
         self.color = (50, 200, 50)  # 绿色
@@ -0,0 +1,214 @@
+import argparse
+import heapq
+import json
+import time
+
+# 波次文件格式（时间单位为秒）：
+# {
+#   "waves": [
+#     {"delay": 2.0, "groups": [
+#       {"type": "enemy1", "count": 8, "interval": 0.5},
+#       {"type": {"enemy1": 0.7, "enemy2": 0.3}, "count": 4, "interval": 1.0, "start": 3.0}
+#     ]}
+#   ],
+#   "endless": {"count": 30, "growth": 1.15, "duration": 15, "types": {"enemy1": 0.7, "enemy2": 0.3}}
+# }
+# type为敌人类型名，或按权重随机的{类型: 权重}；endless可选，文件中的波次用完后按它无限生成
+DEFAULT_ENDLESS = {
+    "count": 20,        # 第一波无尽波次的敌人数
+    "growth": 1.25,     # 每波敌人数的增长倍数
+    "duration": 10.0,   # 每波的生成时长，敌人均匀分布在这段时间内
+    "delay": 1.0,       # 波次之间的间隔
+    "types": {"enemy1": 0.7, "enemy2": 0.3},
+    "overlap": False    # 为True时不等上一波清空就开始下一波（压力测试）
+}
+
+WAVE_KEYS = {'delay', 'groups'}
+GROUP_KEYS = {'type', 'count', 'interval', 'start'}
+
+def load_waves(path):
+    # 读取并校验波次文件
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    validate_waves(config)
+    return config
+
+def validate_waves(config):
+    for key in config:
+        if key not in ('waves', 'endless'):
+            raise ValueError(f"未知的波次配置: {key}")
+    for i, wave in enumerate(config.get('waves', []), 1):
+        for key in wave:
+            if key not in WAVE_KEYS:
+                raise ValueError(f"第{i}波: 未知字段 {key}")
+        for group in wave.get('groups', []):
+            for key in group:
+                if key not in GROUP_KEYS:
+                    raise ValueError(f"第{i}波: 未知字段 {key}")
+            if 'type' not in group or 'count' not in group:
+                raise ValueError(f"第{i}波: 敌人组缺少type或count")
+    for key in config.get('endless') or {}:
+        if key not in DEFAULT_ENDLESS:
+            raise ValueError(f"未知的无尽模式参数: {key}")
+
+class WaveScheduler:
+    """按波次文件生成敌人：每个敌人的生成时刻放入按tick排序的优先队列，
+    每帧只取出到期的部分，同一波的敌人分散在多个tick中生成"""
+    def __init__(self, config, tick_rate=60, endless=False):
+        validate_waves(config)
+        self.waves = config.get('waves', [])
+        self.endless = None
+        if config.get('endless') is not None or endless:
+            self.endless = dict(DEFAULT_ENDLESS, **(config.get('endless') or {}))
+        self.tick_rate = tick_rate
+        self.queue = []  # (生成tick, 序号, 类型)
+        self._seq = 0
+        self.index = 0   # 下一波在文件中的下标
+        self.next_wave_tick = None
+        self.finished = False  # 文件中的波次全部生成完且没有无尽模式
+
+    def pending(self):
+        return len(self.queue)
+
+    def get_state(self):
+        # 供Simulation.snapshot使用；波次定义来自构造参数，不保存
+        return {"queue": self.queue, "seq": self._seq, "index": self.index,
+                "next_wave_tick": self.next_wave_tick, "finished": self.finished}
+
+    def set_state(self, state):
+        self.queue = [tuple(item) for item in state["queue"]]  # 保存时已是堆序
+        self._seq = state["seq"]
+        self.index = state["index"]
+        self.next_wave_tick = state["next_wave_tick"]
+        self.finished = state["finished"]
+
+    def _ticks(self, seconds):
+        return round(seconds * self.tick_rate)
+
+    def _next_wave(self):
+        # 返回下一波的定义，无尽模式下按增长倍数生成
+        if self.index < len(self.waves):
+            return self.waves[self.index]
+        if self.endless is None:
+            return None
+        endless = self.endless
+        count = max(1, round(endless['count'] * endless['growth'] ** (self.index - len(self.waves))))
+        return {
+            "delay": endless['delay'],
+            "groups": [{"type": endless['types'], "count": count,
+                        "interval": endless['duration'] / count}]
+        }
+
+    def update(self, sim):
+        # 每帧调用：必要时开始下一波，然后生成所有到期的敌人
+        overlap = self.endless is not None and self.endless['overlap'] and \
+            self.index >= len(self.waves)
+        if not self.finished and not self.queue and (overlap or not sim.enemies):
+            wave = self._next_wave()
+            if wave is None:
+                self.finished = True
+            else:
+                if self.next_wave_tick is None:
+                    self.next_wave_tick = sim.tick + self._ticks(wave.get('delay', 0))
+                if sim.tick >= self.next_wave_tick:
+                    self._schedule(wave, sim.tick)
+                    self.next_wave_tick = None
+                    self.index += 1
+                    sim.wave += 1
+
+        queue = self.queue
+        while queue and queue[0][0] <= sim.tick:
+            _, _, enemy_type = heapq.heappop(queue)
+            sim.spawn_enemy(self._pick(enemy_type, sim.rng))
+
+    def _schedule(self, wave, now):
+        for group in wave.get('groups', []):
+            start = now + self._ticks(group.get('start', 0))
+            interval = group.get('interval', 0) * self.tick_rate
+            for i in range(group['count']):
+                heapq.heappush(self.queue, (start + round(i * interval), self._seq, group['type']))
+                self._seq += 1
+
+    def _pick(self, enemy_type, rng):
+        # 权重表在生成时才抽取，保证与随机数序列一致
+        if isinstance(enemy_type, str):
+            return enemy_type
+        r = rng.random() * sum(enemy_type.values())
+        for name, weight in enemy_type.items():
+            r -= weight
+            if r < 0:
+                return name
+        return name
+
+def run_stress(seed=0, tick_rate=60, budget_ms=None, max_waves=100, batched_enemies=False,
+               config=None, placements=(), towers_per_wave=2):
+    """无尽压力模式：敌人数逐波增长且波次重叠，逐波输出存活敌人数、防御塔数、子弹数和每tick耗时，
+    平均每tick耗时超过预算（默认一帧的时长）时停止，用于寻找引擎的实际承载上限
+    placements为(帧, 塔类型, 列, 行)序列（见headless.parse_placement）；此外每波开始时
+    在离路径最近的空闲格子上追加towers_per_wave座塔，使索敌、空间索引和子弹命中随规模增长"""
+    from simulation import Simulation, TOWER_CLASSES
+    from level import distance_field
+    config = dict(config or {})
+    config['endless'] = dict(config.get('endless') or {}, overlap=True)
+    budget_ms = budget_ms or 1000.0 / tick_rate
+    sim = Simulation(seed=seed, batched_enemies=batched_enemies, tick_rate=tick_rate,
+                     params={'lives': 10**9, 'money': 10**9}, waves=config)
+    distance = distance_field(sim.path, sim.grid)[0]
+    kinds = sorted(TOWER_CLASSES)
+    pending = sorted(placements)
+
+    def build(tick):
+        while pending and pending[0][0] <= tick:
+            _, tower_type, col, row = pending.pop(0)
+            sim.build_tower(tower_type, col * sim.grid_size, row * sim.grid_size)
+
+    def add_towers():
+        cells = sorted(sim.grid.free_cells(), key=lambda cell: distance[cell[1], cell[0]])
+        for col, row in cells[:towers_per_wave]:
+            sim.build_tower(kinds[len(sim.towers) % len(kinds)], col * sim.grid_size,
+                            row * sim.grid_size)
+
+    clock = time.perf_counter
+    while sim.wave == 1:
+        build(sim.tick)
+        sim.update()  # 等待第一波开始
+    while sim.wave - 1 <= max_waves:  # sim.wave为下一波的编号
+        wave = sim.wave
+        add_towers()
+        start = clock()
+        ticks = peak = fired = 0
+        while sim.wave == wave:
+            build(sim.tick)
+            fired += sim.update()
+            ticks += 1
+            peak = max(peak, len(sim.enemies))
+        ms = (clock() - start) * 1000 / ticks
+        result = {"wave": wave - 1, "ticks": ticks, "peak_enemies": peak,
+                  "towers": len(sim.towers), "shots_per_tick": fired / ticks,
+                  "projectiles": sim.projectiles.count, "ms_per_tick": ms}
+        yield result
+        if ms > budget_ms:
+            break
+
+def main():
+    from headless import parse_placement
+    parser = argparse.ArgumentParser(description="无尽压力测试：寻找引擎能承载的敌人数")
+    parser.add_argument('--waves-file', metavar='FILE', help="波次文件，其中的endless参数用于压力测试")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--tick-rate', type=int, default=60, help="模拟频率")
+    parser.add_argument('--budget-ms', type=float, default=None, help="每tick耗时上限，默认一帧的时长")
+    parser.add_argument('--max-waves', type=int, default=100, help="最多运行的波数")
+    parser.add_argument('--batched-enemies', action='store_true', help="使用NumPy批量敌人引擎")
+    parser.add_argument('--place', action='append', default=[], type=parse_placement,
+                        metavar='TYPE:COL,ROW[@TICK]', help="脚本化建造防御塔，可重复")
+    parser.add_argument('--towers-per-wave', type=int, default=2,
+                        help="每波在路径旁追加的防御塔数，0为只使用--place的布局")
+    args = parser.parse_args()
+
+    config = load_waves(args.waves_file) if args.waves_file else None
+    for result in run_stress(args.seed, args.tick_rate, args.budget_ms, args.max_waves,
+                             args.batched_enemies, config, args.place, args.towers_per_wave):
+        print(json.dumps(result), flush=True)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file